@@ -0,0 +1,82 @@
+"""
+Benchmark of image storage presets: encode time and bytes on disk per preset.
+
+Uses images from the given directory (JPEG, PNG, WEBP), or a synthetic corpus of photo-like
+JPEG and PNG images if no directory is given. Run from the project root::
+
+    python -m benchmarks.image_storage [--images DIR]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.helsa.services.image_encoding import STORAGE_PRESETS, save_image
+
+
+def _synthetic_corpus(count: int) -> list[tuple[str, Image.Image]]:
+    rng = random.Random(42)
+    corpus = []
+    for i in range(count):
+        width, height = rng.choice([(1600, 1200), (2000, 1500), (1200, 1600)])
+        image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        image = Image.blend(image, Image.effect_noise((width, height), 40).convert("RGB"), 0.3)
+        draw = ImageDraw.Draw(image)
+        for _ in range(30):
+            x, y = rng.randrange(width), rng.randrange(height)
+            radius = rng.randrange(20, 200)
+            color = tuple(rng.randrange(120, 255) for _ in range(3))
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+        image = image.filter(ImageFilter.GaussianBlur(2))
+        # uploads arrive as phone camera JPEGs and screenshot PNGs
+        img_format = "JPEG" if i % 2 == 0 else "PNG"
+        encoded = BytesIO()
+        image.save(encoded, format=img_format)
+        corpus.append((img_format, Image.open(BytesIO(encoded.getvalue()))))
+
+    return corpus
+
+
+def _directory_corpus(directory: str) -> list[tuple[str, Image.Image]]:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            image = Image.open(os.path.join(directory, name), formats=["JPEG", "PNG", "WEBP"])
+        except (OSError, ValueError):
+            continue
+        corpus.append((image.format, image))
+
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory with sample images")
+    parser.add_argument("--count", type=int, default=10, help="count of synthetic images")
+    args = parser.parse_args()
+
+    corpus = _directory_corpus(args.images) if args.images else _synthetic_corpus(args.count)
+    # same conversion as in upload_images
+    corpus = [(img_format, image.convert("RGB")) for img_format, image in corpus]
+    original_bytes = sum(image.width * image.height * 3 for _, image in corpus)
+    print(f"images: {len(corpus)} ({original_bytes / 2 ** 20:.0f} MiB of raw RGB)")
+    print(f"{'preset':<10}{'format':<10}{'mean ms':>10}{'max ms':>10}{'total KiB':>12}{'mean KiB':>10}")
+
+    for preset_name, preset in STORAGE_PRESETS.items():
+        durations, sizes = [], []
+        for img_format, image in corpus:
+            output = BytesIO()
+            started = time.perf_counter()
+            save_image(image, output, preset_name, img_format)
+            durations.append((time.perf_counter() - started) * 1000)
+            sizes.append(output.tell())
+        print(f"{preset_name:<10}{preset.format or 'as input':<10}{statistics.mean(durations):>10.1f}"
+              f"{max(durations):>10.1f}{sum(sizes) / 1024:>12.0f}{statistics.mean(sizes) / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
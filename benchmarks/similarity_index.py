@@ -0,0 +1,82 @@
+"""
+Benchmark of the similarity index: build time and query latency over synthetic searches.
+
+Run from the project root (needs `numpy`, installed with the `similarity` extra)::
+
+    python -m benchmarks.similarity_index --searches 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from src.helsa.services.similarity_index import SimilarityIndex
+
+BODY_PARTS = ["arm", "leg", "back", "chest", "neck", "face", "scalp", "stomach", "knee", "hand", "foot", "throat"]
+SYMPTOMS = ["red rash", "itching", "sharp pain", "dull ache", "swelling", "fever", "dry cough", "headache",
+            "nausea", "dizziness", "burning sensation", "numbness", "blisters", "stiffness", "fatigue"]
+DURATIONS = ["since yesterday", "for two days", "for a week", "since March", "after running", "every morning"]
+
+
+def _random_symptoms(rng: random.Random) -> str:
+    parts = [f"{rng.choice(SYMPTOMS)} on my {rng.choice(BODY_PARTS)}" for _ in range(rng.randint(1, 3))]
+    return f"I have {' and '.join(parts)} {rng.choice(DURATIONS)}"
+
+
+def _random_profile(rng: random.Random) -> tuple:
+    return rng.randrange(0, 90), rng.choice(["professional", "friendly", "funny"]), rng.choice(["medical", "simple"])
+
+
+def _features(profile: tuple) -> list[str]:
+    age, tone, style = profile
+    return [f"age={age // 10 * 10}", f"tone={tone}", f"style={style}"]
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(percentile) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    user_ids = [uuid.uuid4() for _ in range(args.users)]
+    index = SimilarityIndex(dimensions=args.dimensions)
+
+    started = time.perf_counter()
+    for _ in range(args.searches):
+        profile = _random_profile(rng)
+        index.add(
+            uuid.uuid4(),
+            index.vectorize(_random_symptoms(rng), _features(profile)),
+            [("user", rng.choice(user_ids)), ("profile", *profile)]
+        )
+    build_seconds = time.perf_counter() - started
+
+    latencies = {"query per user": [], "query per profile": [], "query all": []}
+    for _ in range(args.queries):
+        profile = _random_profile(rng)
+        vector = index.vectorize(_random_symptoms(rng), _features(profile))
+        for name, group in (("query per user", ("user", rng.choice(user_ids))),
+                            ("query per profile", ("profile", *profile)),
+                            ("query all", None)):
+            started = time.perf_counter()
+            index.query(vector, 5, group=group)
+            latencies[name].append((time.perf_counter() - started) * 1000)
+
+    print(f"searches:            {args.searches}")
+    print(f"dimensions:          {args.dimensions}")
+    print(f"build:               {build_seconds:.1f} s ({args.searches / build_seconds:,.0f} searches/s)")
+    print(f"vectors memory:      {args.searches * args.dimensions * 2 / 2 ** 20:,.0f} MiB")
+    for name, samples in latencies.items():
+        print(f"{name + ':':<21}p50 {_percentile(samples, 50):.2f} ms, p99 {_percentile(samples, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
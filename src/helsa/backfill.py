@@ -0,0 +1,21 @@
+"""
+Command line entry point for backfilling full-text documents and analytics rollups of searches
+saved before these were introduced. Run it once after upgrading, running it again is harmless.
+
+Usage (from the project root, with the same environment as the server)::
+
+    python -m src.helsa.backfill
+"""
+from src.helsa.database import create_db_and_tables
+from src.helsa.services.backfill_service import run_backfill
+from src.helsa.services.partition_service import ensure_search_partitions
+
+
+def main():
+    create_db_and_tables()
+    ensure_search_partitions()
+    run_backfill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from collections import deque
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.helsa.core import constants
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.models.admission import AdmissionRouteClass, AdmissionStatus
+
+ADMISSION_STATUS_PATH = "/admin/admission"
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit of a route class with a bounded FIFO queue of waiting requests.
+
+    A released slot is handed over directly to the first waiting request, so queued
+    requests are admitted in order and new requests can not overtake them.
+    Used from the event loop only, so it needs no locking.
+    """
+
+    def __init__(self, route_class: AdmissionRouteClass):
+        self.route_class = route_class
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue for up to `queue_timeout_seconds` if all are taken.
+
+        :return: True if the slot was taken, False if the request is rejected
+        """
+        if self.in_flight < self.route_class.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        if len(self._waiters) >= self.route_class.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=self.route_class.queue_timeout_seconds)
+        except asyncio.CancelledError:
+            # client disconnected while waiting, pass on a slot handed over meanwhile
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+        if waiter.done():
+            return True
+        self._waiters.remove(waiter)
+        self.rejected += 1
+        return False
+
+    def release(self):
+        """ Release a slot, handing it over to the first waiting request if any. """
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.in_flight -= 1
+
+    def status(self) -> AdmissionStatus:
+        return AdmissionStatus(
+            name=self.route_class.name,
+            in_flight=self.in_flight,
+            queued=len(self._waiters),
+            max_concurrency=self.route_class.max_concurrency,
+            max_queue=self.route_class.max_queue,
+            rejected=self.rejected
+        )
+
+
+_limiters = [AdmissionLimiter(route_class) for route_class in settings.ADMISSION_ROUTE_CLASSES]
+
+
+def _get_limiter(path: str) -> AdmissionLimiter | None:
+    """
+    Get limiter of the first route class matching the path.
+
+    :param path: request path
+    :return: `AdmissionLimiter`, or None if no route class matches
+    """
+    for limiter in _limiters:
+        prefixes = limiter.route_class.path_prefixes
+        if not prefixes or any(path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in prefixes):
+            return limiter
+
+    return None
+
+
+def get_admission_status() -> list[AdmissionStatus]:
+    """
+    Get current in-flight and queued request counts per route class in this worker.
+
+    :return: list of `AdmissionStatus`, one per route class
+    """
+    return [limiter.status() for limiter in _limiters]
+
+
+class AdmissionControlMiddleware:
+    """
+    Limit concurrent requests per route class of `ADMISSION_ROUTE_CLASSES` in each worker.
+
+    Excess requests wait in the bounded queue of their class and are rejected with
+    503 Service Unavailable and `Retry-After` when the queue is full or the wait times out,
+    before any work is done for them. A separate class for `/access` routes keeps capacity
+    for logins when expensive routes are saturated. The status endpoint is never limited.
+    Installed only if `ADMISSION_CONTROL_ENABLED` is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter = _get_limiter(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None or scope["path"] == ADMISSION_STATUS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            route_class = limiter.route_class
+            logger.warning(constants.ADMISSION_LOG_REQUEST_REJECTED.format(
+                method=scope["method"], path=scope["path"], route_class=route_class.name, in_flight=limiter.in_flight
+            ))
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(route_class.retry_after_seconds).encode()),
+                ],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": json.dumps({"detail": constants.ADMISSION_EXC_MSG_SERVER_BUSY}).encode(),
+            })
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,368 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from src.helsa.core.config import settings
+from src.helsa.database import engine
+from src.helsa.models.cache import CacheEntry, CacheNamespace
+
+
+class CacheBackend(ABC):
+    """
+    Cache shared by all uvicorn workers.
+
+    Entries live in namespaces. Every entry expires after its TTL, the backend evicts entries
+    when it is full regardless of their TTL, so short-lived entries are not evicted first,
+    and `invalidate` drops all entries of a namespace at once by bumping its version.
+    """
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> bytes | None:
+        """
+        Get value of a valid entry.
+
+        :param namespace: namespace of the entry
+        :param key: key of the entry within the namespace
+        :return: cached value, or None if there is no valid entry
+        """
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        """
+        Create or replace an entry.
+
+        :param namespace: namespace of the entry
+        :param key: key of the entry within the namespace
+        :param value: value to cache
+        :param ttl_seconds: time after which the entry expires
+        :return: True if the value was cached, False if it can not be cached, e.g. too large
+        """
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        """
+        Create an entry only if there is no valid entry with the same key.
+
+        :param namespace: namespace of the entry
+        :param key: key of the entry within the namespace
+        :param value: value to cache
+        :param ttl_seconds: time after which the entry expires
+        :return: True if the entry was created, False if a valid entry already exists or value can not be cached
+        """
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        """
+        Delete an entry.
+
+        :param namespace: namespace of the entry
+        :param key: key of the entry within the namespace
+        """
+
+    @abstractmethod
+    def invalidate(self, namespace: str):
+        """
+        Invalidate all entries of a namespace, in all workers.
+
+        :param namespace: namespace to invalidate
+        """
+
+
+def _hash64(data: bytes) -> int:
+    """ Stable 64-bit hash shared by all processes (unlike the randomized built-in `hash`). Never 0. """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") or 1
+
+
+class MmapCacheBackend(CacheBackend):
+    """
+    Cache in a memory-mapped file (on `/dev/shm` by default) shared by all workers on one host.
+
+    The file holds a table of namespace versions followed by fixed size slots, split into
+    stripes. An entry is placed into one of `PROBE_SLOTS` slots of its stripe, picked by hash
+    of its key. If all of them are taken by valid entries, the least recently used one is evicted,
+    so the cache never outgrows the file. Each stripe is guarded by a byte-range file lock
+    across processes and a thread lock within a process.
+    """
+    MAGIC = b"HLSCACH2"
+    PROBE_SLOTS = 8
+    STRIPES = 64
+    VERSION_SLOTS = 256
+    # magic, file size, slot size
+    _FILE_HEADER = struct.Struct("<8sQQ")
+    # key hash, expiration timestamp, last use timestamp, key length, value length
+    _SLOT_HEADER = struct.Struct("<QddII")
+    _LAST_USED = struct.Struct("<d")
+    _LAST_USED_OFFSET = 16
+
+    def __init__(self, path: str, size_bytes: int, slot_bytes: int):
+        self._slot_bytes = slot_bytes
+        self._versions_offset = self._FILE_HEADER.size
+        self._slots_offset = self._versions_offset + self.VERSION_SLOTS * 8
+        self._stripe_slots = (size_bytes - self._slots_offset) // slot_bytes // self.STRIPES
+        if self._stripe_slots < self.PROBE_SLOTS:
+            raise ValueError("Cache file is too small for the slot size.")
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # lock byte ranges: one byte per stripe, then one for namespace versions
+        self._thread_locks = [threading.Lock() for _ in range(self.STRIPES + 1)]
+        with self._lock(self.STRIPES):
+            if os.fstat(self._fd).st_size != size_bytes:
+                os.ftruncate(self._fd, size_bytes)
+            self._map = mmap.mmap(self._fd, size_bytes)
+            header = self._FILE_HEADER.pack(self.MAGIC, size_bytes, slot_bytes)
+            if self._map[:self._FILE_HEADER.size] != header:
+                # new file, or file created with a different layout
+                self._map[:] = bytes(size_bytes)
+                self._map[:self._FILE_HEADER.size] = header
+
+    @contextmanager
+    def _lock(self, index: int):
+        """
+        Lock a stripe (or namespace versions) across threads and processes.
+
+        File locks are held per process, so threads of one process are excluded by a thread lock.
+
+        :param index: index of the stripe, `STRIPES` for namespace versions
+        """
+        with self._thread_locks[index]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, index)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+
+    def _version_offset(self, namespace: str) -> int:
+        # namespaces colliding in the table share their version, invalidating one invalidates both
+        return self._versions_offset + _hash64(namespace.encode("utf-8")) % self.VERSION_SLOTS * 8
+
+    def _entry_key(self, namespace: str, key: str) -> bytes:
+        # read without lock, versions only grow and a stale read just misses the entry
+        version, = struct.unpack_from("<Q", self._map, self._version_offset(namespace))
+        return f"{namespace}\0{version}\0{key}".encode("utf-8")
+
+    def _probe_offsets(self, key_hash: int) -> tuple[int, list[int]]:
+        """
+        Get stripe of the key and offsets of the slots the key can be placed into.
+
+        :param key_hash: hash of the entry key
+        :return: tuple of stripe index and slot offsets
+        """
+        stripe = key_hash % self.STRIPES
+        first = key_hash // self.STRIPES % self._stripe_slots
+        return stripe, [
+            self._slots_offset + (stripe * self._stripe_slots + (first + i) % self._stripe_slots) * self._slot_bytes
+            for i in range(self.PROBE_SLOTS)
+        ]
+
+    def _find(self, offsets: list[int], key_hash: int, entry_key: bytes) -> int | None:
+        """ Find offset of the slot holding the key, valid or expired. Caller holds the stripe lock. """
+        for offset in offsets:
+            slot_hash, _, _, key_length, _ = self._SLOT_HEADER.unpack_from(self._map, offset)
+            key_start = offset + self._SLOT_HEADER.size
+            if slot_hash == key_hash and self._map[key_start:key_start + key_length] == entry_key:
+                return offset
+        return None
+
+    def _write(self, offset: int, key_hash: int, entry_key: bytes, value: bytes, ttl_seconds: float):
+        key_start = offset + self._SLOT_HEADER.size
+        self._map[key_start:key_start + len(entry_key) + len(value)] = entry_key + value
+        now = time.time()
+        self._SLOT_HEADER.pack_into(self._map, offset, key_hash, now + ttl_seconds, now, len(entry_key), len(value))
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        entry_key = self._entry_key(namespace, key)
+        key_hash = _hash64(entry_key)
+        stripe, offsets = self._probe_offsets(key_hash)
+        with self._lock(stripe):
+            offset = self._find(offsets, key_hash, entry_key)
+            if offset is None:
+                return None
+            _, expires_at, _, key_length, value_length = self._SLOT_HEADER.unpack_from(self._map, offset)
+            now = time.time()
+            if expires_at <= now:
+                return None
+            self._LAST_USED.pack_into(self._map, offset + self._LAST_USED_OFFSET, now)
+            value_start = offset + self._SLOT_HEADER.size + key_length
+            return self._map[value_start:value_start + value_length]
+
+    def _store(self, namespace: str, key: str, value: bytes, ttl_seconds: float, replace: bool) -> bool:
+        entry_key = self._entry_key(namespace, key)
+        if self._SLOT_HEADER.size + len(entry_key) + len(value) > self._slot_bytes:
+            return False
+
+        key_hash = _hash64(entry_key)
+        stripe, offsets = self._probe_offsets(key_hash)
+        now = time.time()
+        with self._lock(stripe):
+            offset = self._find(offsets, key_hash, entry_key)
+            if offset is not None:
+                _, expires_at, _, _, _ = self._SLOT_HEADER.unpack_from(self._map, offset)
+                if not replace and expires_at > now:
+                    return False
+            else:
+                # free or expired slot, otherwise evict the least recently used entry
+                slots = [self._SLOT_HEADER.unpack_from(self._map, offset)[1:3] for offset in offsets]
+                ranks = [(expires_at > now, last_used) for expires_at, last_used in slots]
+                offset = offsets[ranks.index(min(ranks))]
+            self._write(offset, key_hash, entry_key, value, ttl_seconds)
+
+        return True
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return self._store(namespace, key, value, ttl_seconds, replace=True)
+
+    def add(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return self._store(namespace, key, value, ttl_seconds, replace=False)
+
+    def delete(self, namespace: str, key: str):
+        entry_key = self._entry_key(namespace, key)
+        key_hash = _hash64(entry_key)
+        stripe, offsets = self._probe_offsets(key_hash)
+        with self._lock(stripe):
+            offset = self._find(offsets, key_hash, entry_key)
+            if offset is not None:
+                self._SLOT_HEADER.pack_into(self._map, offset, 0, 0.0, 0.0, 0, 0)
+
+    def invalidate(self, namespace: str):
+        offset = self._version_offset(namespace)
+        with self._lock(self.STRIPES):
+            version, = struct.unpack_from("<Q", self._map, offset)
+            struct.pack_into("<Q", self._map, offset, version + 1)
+
+
+class PostgresCacheBackend(CacheBackend):
+    """
+    Cache in unlogged Postgres tables, shared by workers on all hosts using the same db.
+
+    Every operation is a single statement. Expired entries, entries of invalidated namespace
+    versions and, above `max_entries`, entries stored first are pruned on a sample of writes.
+    Reads do not track use, so they stay read-only.
+    """
+
+    def __init__(self, engine: Engine, max_entries: int, prune_probability: float = 0.01):
+        self._engine = engine
+        self._max_entries = max_entries
+        self._prune_probability = prune_probability
+
+    @staticmethod
+    def _current_version(namespace: str):
+        return func.coalesce(
+            select(CacheNamespace.version).where(CacheNamespace.namespace == namespace).scalar_subquery(), 0
+        )
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        statement = select(CacheEntry.value).where(
+            CacheEntry.namespace == namespace,
+            CacheEntry.key == key,
+            CacheEntry.version == self._current_version(namespace),
+            CacheEntry.expires_at > func.now()
+        )
+        with self._engine.connect() as connection:
+            return connection.execute(statement).scalar()
+
+    def _store(self, namespace: str, key: str, value: bytes, ttl_seconds: float, replace: bool) -> bool:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        statement = insert(CacheEntry).values(
+            namespace=namespace,
+            key=key,
+            version=self._current_version(namespace),
+            value=value,
+            expires_at=expires_at
+        )
+        conflict_update = {
+            "version": statement.excluded.version,
+            "value": statement.excluded.value,
+            "expires_at": statement.excluded.expires_at,
+            "stored_at": func.now()
+        }
+        # without `replace`, only an expired or invalidated entry is overwritten
+        statement = statement.on_conflict_do_update(
+            index_elements=[CacheEntry.namespace, CacheEntry.key],
+            set_=conflict_update,
+            where=None if replace else (
+                (CacheEntry.expires_at <= func.now()) | (CacheEntry.version != statement.excluded.version)
+            )
+        )
+        with self._engine.begin() as connection:
+            stored = connection.execute(statement).rowcount > 0
+
+        if random.random() < self._prune_probability:
+            self.prune()
+        return stored
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return self._store(namespace, key, value, ttl_seconds, replace=True)
+
+    def add(self, namespace: str, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return self._store(namespace, key, value, ttl_seconds, replace=False)
+
+    def delete(self, namespace: str, key: str):
+        with self._engine.begin() as connection:
+            connection.execute(delete(CacheEntry).where(CacheEntry.namespace == namespace, CacheEntry.key == key))
+
+    def invalidate(self, namespace: str):
+        statement = insert(CacheNamespace).values(namespace=namespace, version=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CacheNamespace.namespace],
+            set_={"version": CacheNamespace.version + 1}
+        )
+        with self._engine.begin() as connection:
+            connection.execute(statement)
+
+    def prune(self):
+        """ Delete expired and invalidated entries and the entries stored first above `max_entries`. """
+        stale_version = CacheEntry.version != func.coalesce(
+            select(CacheNamespace.version)
+            .where(CacheNamespace.namespace == CacheEntry.namespace)
+            .scalar_subquery(),
+            0
+        )
+        with self._engine.begin() as connection:
+            connection.execute(delete(CacheEntry).where((CacheEntry.expires_at <= func.now()) | stale_version))
+            excess = connection.execute(select(func.count()).select_from(CacheEntry)).scalar() - self._max_entries
+            if excess > 0:
+                oldest = (
+                    select(CacheEntry.namespace, CacheEntry.key)
+                    .order_by(CacheEntry.stored_at)
+                    .limit(excess)
+                    .with_for_update(skip_locked=True)
+                )
+                connection.execute(delete(CacheEntry).where(tuple_(CacheEntry.namespace, CacheEntry.key).in_(oldest)))
+
+
+_cache: CacheBackend | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheBackend:
+    """
+    Get the shared cache backend selected by `CACHE_BACKEND`, created on first use in each worker.
+
+    :return: `CacheBackend` instance
+    """
+    global _cache
+    # lock only until the backend is created, every later call just reads the global
+    if _cache is not None:
+        return _cache
+
+    with _cache_lock:
+        if _cache is None:
+            if settings.CACHE_BACKEND == "postgres":
+                _cache = PostgresCacheBackend(engine, settings.CACHE_POSTGRES_MAX_ENTRIES)
+            else:
+                _cache = MmapCacheBackend(
+                    settings.CACHE_MMAP_PATH, settings.CACHE_MMAP_SIZE_BYTES, settings.CACHE_MMAP_SLOT_BYTES
+                )
+
+    return _cache
@@ -1,5 +1,11 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
+from src.helsa.models.routing import ModelRoute
+from src.helsa.models.image import StoragePresetName
+from src.helsa.models.admission import AdmissionRouteClass
+
 
 class Settings(BaseSettings):
     # env. variables
@@ -17,8 +23,80 @@ class Settings(BaseSettings):
 
     # constants
     UPLOADS_DIRECTORY: str = "./src/helsa/uploads"
+    IMAGE_STORAGE_PRESET: StoragePresetName = "balanced"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    ADMIN_BULK_BATCH_SIZE: int = 1000
+    PASSWORD_HASH_WORKERS: int | None = None
+    SEARCH_TEXT_SEARCH_CONFIG: str = "english"
+    SIMILARITY_INDEX_ENABLED: bool = False
+    SIMILARITY_INDEX_DIMENSIONS: int = 256
+    SIMILARITY_INDEX_REFRESH_SECONDS: int = 30
+    SIMILARITY_SHORT_CIRCUIT_ENABLED: bool = False
+    SIMILARITY_NEAR_DUPLICATE_THRESHOLD: float = 0.95
+    RETENTION_ENABLED: bool = False
+    RETENTION_DAYS_FREE_TIER: int | None = 365
+    RETENTION_DAYS_PREMIUM_TIER: int | None = None
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_BATCH_PAUSE_SECONDS: float = 0.1
+    RETENTION_INTERVAL_SECONDS: int = 3600
+    BACKFILL_BATCH_SIZE: int = 1000
+    SEARCH_PARTITIONS_AHEAD_MONTHS: int = 3
+    SEARCH_PARTITION_MAINTENANCE_SECONDS: int = 24 * 60 * 60
+    # dropping partitions waits for locks of hot tables at most this long, queries queue behind the wait
+    SEARCH_PARTITION_LOCK_TIMEOUT_MS: int = 2000
+    SEARCH_PARTITION_DROP_RETRIES: int = 5
+    SEARCH_PARTITION_DROP_RETRY_SECONDS: float = 10.0
+    EXPORT_FETCH_SIZE: int = 500
+    USAGE_FLUSH_SECONDS: float = 10.0
+    USAGE_FLUSH_BATCH_SIZE: int = 1000
+    CACHE_BACKEND: Literal["mmap", "postgres"] = "mmap"
+    CACHE_MMAP_PATH: str = "/dev/shm/helsa-cache"
+    CACHE_MMAP_SIZE_BYTES: int = 64 * 1024 * 1024
+    CACHE_MMAP_SLOT_BYTES: int = 4096
+    CACHE_POSTGRES_MAX_ENTRIES: int = 100_000
+    IDEMPOTENCY_KEY_EXPIRE_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_IN_FLIGHT_SECONDS: int = 300
+    IDEMPOTENCY_POLL_SECONDS: float = 0.5
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_DIRECTORY: str = "./profiles"
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_MAX_STALENESS_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 1.0
+    REPLICA_CONNECT_TIMEOUT_SECONDS: int = 2
+    ADMISSION_CONTROL_ENABLED: bool = False
+    # limits per worker, first matching class wins, set as JSON list in env. variable to override;
+    # `/diagnose` holds a db connection while waiting for the AI service and `/history/export` while
+    # streaming the whole history, so the classes other than `access` should stay below the db pool size
+    # (15 by default) to leave connections for logins; long exports have their own class, so they do not
+    # take the slots of short requests in `default`; all classes together should stay below the threadpool size (40),
+    # so the admin check of the status endpoint always gets a thread
+    ADMISSION_ROUTE_CLASSES: list[AdmissionRouteClass] = [
+        AdmissionRouteClass(name="access", path_prefixes=["/access"], max_concurrency=8, max_queue=64,
+                            queue_timeout_seconds=10, retry_after_seconds=1),
+        AdmissionRouteClass(name="diagnose", path_prefixes=["/diagnose"], max_concurrency=8, max_queue=8,
+                            queue_timeout_seconds=2, retry_after_seconds=30),
+        AdmissionRouteClass(name="export", path_prefixes=["/history/export"], max_concurrency=2, max_queue=8,
+                            queue_timeout_seconds=10, retry_after_seconds=30),
+        AdmissionRouteClass(name="default", max_concurrency=4, max_queue=32, queue_timeout_seconds=10,
+                            retry_after_seconds=5),
+    ]
+    # observed latency of a model older than this is forgotten, so routes excluding a slow model try it again
+    MODEL_LATENCY_MAX_AGE_SECONDS: float = 60.0
+    # first matching route wins, set as JSON list in env. variable to override; keep `timeout_seconds`
+    # + `fallback_timeout_seconds` of each route below the 120 s timeout of clients
+    MODEL_ROUTES: list[ModelRoute] = [
+        ModelRoute(name="images", has_images=True, model="gpt-4.1", fallback_model="gpt-4.1-mini",
+                   timeout_seconds=70, fallback_timeout_seconds=45),
+        ModelRoute(name="premium", has_premium_tier=True, model="gpt-4.1", fallback_model="gpt-4.1-mini"),
+        ModelRoute(name="short-text", max_symptoms_length=200, model="gpt-4.1-mini", fallback_model="gpt-4.1",
+                   timeout_seconds=30),
+        ModelRoute(name="default", model="gpt-4.1", fallback_model="gpt-4.1-mini", max_observed_latency_seconds=30),
+        ModelRoute(name="default-degraded", model="gpt-4.1-mini", fallback_model="gpt-4.1", timeout_seconds=30),
+    ]
 
     model_config = {
         "env_file": ".env"
@@ -0,0 +1,14 @@
+SECURITY_EXC_MSG_ADMIN_REQUIRED = "Admin privileges are required."
+
+REPLICAS_LOG_NOT_AVAILABLE = "Replica {url!r} is not available: {error}"
+REPLICAS_LOG_CONNECT_FAILED = "Connecting to replica {url!r} failed, reading from primary: {error}"
+
+PROFILING_LOG_REQUEST_PROFILED = (
+    "Request {method} {path} profiled in {filename} ({duration_ms:.0f} ms, {samples} samples)."
+)
+PROFILING_LOG_SAVE_FAILED = "Saving request profile failed"
+
+ADMISSION_LOG_REQUEST_REJECTED = (
+    "Request {method} {path} rejected by admission control of route class {route_class} ({in_flight} in flight)."
+)
+ADMISSION_EXC_MSG_SERVER_BUSY = "Server is busy. Please retry later."
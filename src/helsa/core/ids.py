@@ -0,0 +1,38 @@
+import os
+import time
+import uuid
+from datetime import datetime
+
+
+def _unix_microseconds(timestamp: datetime) -> int:
+    """ Exact Unix time of the timestamp in microseconds, without float rounding. """
+    return int(timestamp.replace(microsecond=0).timestamp()) * 1_000_000 + timestamp.microsecond
+
+
+def uuid7(timestamp: datetime | None = None) -> uuid.UUID:
+    """
+    Generate time-ordered UUID version 7 (RFC 9562).
+
+    Leading 48 bits hold the Unix timestamp in milliseconds followed by 12 bits of sub-millisecond
+    fraction, so ids created close in time are close in B-tree indexes and range partitions of ids
+    are ranges of creation time. The remaining 62 bits are random.
+
+    :param timestamp: creation time encoded in the id (default: now)
+    :return: UUIDv7
+    """
+    nanoseconds = time.time_ns() if timestamp is None else _unix_microseconds(timestamp) * 1000
+    milliseconds, remainder = divmod(nanoseconds, 1_000_000)
+    fraction = remainder * 4096 // 1_000_000
+    random_bits = int.from_bytes(os.urandom(8)) & ((1 << 62) - 1)
+
+    return uuid.UUID(int=milliseconds << 80 | 0x7 << 76 | fraction << 64 | 0b10 << 62 | random_bits)
+
+
+def uuid7_lower_bound(timestamp: datetime) -> uuid.UUID:
+    """
+    Get the lowest UUIDv7 possible at the given time, usable as a range bound of ids.
+
+    :param timestamp: time of the bound, precise to milliseconds
+    :return: UUID sorting before all UUIDv7 created at or after the time
+    """
+    return uuid.UUID(int=_unix_microseconds(timestamp) // 1000 << 80)
@@ -0,0 +1,185 @@
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import anyio
+import jwt
+from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.helsa.core import constants
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.models.user import User
+
+PROFILE_REQUEST_HEADER = b"x-profile"
+PROFILE_FILE_HEADER = b"x-profile-file"
+
+# leaf frames of threads waiting for work, not doing any
+_IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+_STDLIB_PATH = sysconfig.get_paths()["stdlib"]
+
+
+def _frame_label(frame) -> str:
+    """ Label of a stack frame in folded stacks: function name and its shortened location. """
+    code = frame.f_code
+    filename = code.co_filename
+    if "site-packages" in filename:
+        filename = filename.rsplit("site-packages" + os.sep, 1)[-1]
+    elif filename.startswith(_STDLIB_PATH):
+        filename = os.path.relpath(filename, _STDLIB_PATH)
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfiler:
+    """
+    Sampling profiler of a single request.
+
+    A background thread takes stacks of the event loop thread and of the threadpool workers
+    every `PROFILING_INTERVAL_SECONDS` and counts them in folded format (`root;caller;callee count`),
+    read by `flamegraph.pl`, speedscope or inferno. Threads waiting for work are skipped. Work
+    of requests running concurrently in the same worker shows up in the profile as well.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self._interval_seconds = interval_seconds
+        self._loop_thread_id = threading.get_ident()
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sampled_threads(self) -> dict[int, str]:
+        return {
+            thread.ident: thread.name for thread in threading.enumerate()
+            if thread.ident == self._loop_thread_id or type(thread).__module__.startswith("anyio")
+        }
+
+    def _sample(self):
+        while not self._stop.wait(self._interval_seconds):
+            threads = self._sampled_threads()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in threads:
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(threads[thread_id])
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """
+        Stop sampling.
+
+        :return: counts of sampled folded stacks
+        """
+        self._stop.set()
+        self._thread.join()
+        return self._stacks
+
+
+def _is_admin(authorization: str) -> bool:
+    """
+    Check the bearer token of the request belongs to an admin.
+
+    :param authorization: value of the `Authorization` header
+    :return: True if the token is valid and its user is an admin, otherwise False
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        username = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except InvalidTokenError:
+        return False
+
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).first()
+
+    return bool(user and user.is_admin)
+
+
+def _save_profile(path: str, stacks: Counter):
+    """ Save folded stacks to the profile file. """
+    os.makedirs(settings.PROFILING_DIRECTORY, exist_ok=True)
+    with open(path, "w") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests and save their profiles to `PROFILING_DIRECTORY`.
+
+    A request is profiled if it sets the `X-Profile` header with an admin's access token,
+    or if it is sampled at `PROFILING_SAMPLE_RATE`. Only one request is profiled at a time
+    in each worker. The profile covers the whole request, including streamed response body,
+    and its file name is returned in the `X-Profile-File` header.
+    Installed only if `PROFILING_ENABLED` is set, otherwise there is no overhead at all.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._lock = threading.Lock()
+
+    async def _should_profile(self, scope: Scope) -> bool:
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return True
+
+        headers = dict(scope["headers"])
+        if PROFILE_REQUEST_HEADER not in headers:
+            return False
+        return await run_in_threadpool(_is_admin, headers.get(b"authorization", b"").decode("latin-1"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not await self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        filename = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{scope['method']}_{slug}.folded"
+
+        async def send_with_profile_header(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_FILE_HEADER, filename.encode())]
+            await send(message)
+
+        profiler = RequestProfiler(settings.PROFILING_INTERVAL_SECONDS)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_header)
+        finally:
+            # joining the sampling thread blocks, shielded so a cancelled request still stops it
+            with anyio.CancelScope(shield=True):
+                stacks = await run_in_threadpool(profiler.stop)
+            self._lock.release()
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                await run_in_threadpool(_save_profile, os.path.join(settings.PROFILING_DIRECTORY, filename), stacks)
+                logger.info(constants.PROFILING_LOG_REQUEST_PROFILED.format(
+                    method=scope["method"], path=scope["path"], filename=filename, duration_ms=duration_ms,
+                    samples=stacks.total()
+                ))
+            except OSError as e:
+                logger.error(constants.PROFILING_LOG_SAVE_FAILED + ": " + str(e))
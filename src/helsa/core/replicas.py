@@ -0,0 +1,158 @@
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, create_engine
+
+from src.helsa.core import constants
+from src.helsa.core.cache import get_cache
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+
+READ_YOUR_WRITES_NAMESPACE = "read-your-writes"
+
+# Upper bound of the replication lag in seconds, NULL if it is unknown:
+# - 0 if the instance is not a standby at all (e.g. a second local instance used for testing),
+# - seconds since the last message from the primary, if the standby is streaming and replayed all it received,
+# - otherwise seconds since the last replayed transaction, NULL if none was replayed yet.
+# Details of `pg_stat_wal_receiver` are visible only with `pg_read_all_stats` (e.g. via `pg_monitor`),
+# without it the last replayed transaction is used, which overestimates the lag while the primary is idle.
+_REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AND receiver.status = 'streaming'
+            THEN EXTRACT(EPOCH FROM now() - receiver.last_msg_receipt_time)
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    FROM (SELECT 1) AS one
+    LEFT JOIN pg_stat_wal_receiver AS receiver ON true
+""")
+
+
+class _Replica:
+    """ Replica engine with its replication lag, measured by `replica_lag_loop`. """
+
+    def __init__(self, url: str):
+        # replicas can not be written to, fail the same way on a replica used for local testing
+        self.engine = create_engine(
+            url, echo=True, pool_pre_ping=True,
+            connect_args={"connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS}
+        ).execution_options(postgresql_readonly=True)
+        # unknown until the first check, reads go to the primary meanwhile
+        self.lag_seconds: float | None = None
+
+    def check_lag(self):
+        """ Measure replication lag of the replica, None if it is unknown or the replica is not available. """
+        try:
+            with self.engine.connect() as connection:
+                lag = connection.execute(_REPLICA_LAG_QUERY).scalar()
+            self.lag_seconds = max(float(lag), 0.0) if lag is not None else None
+        except SQLAlchemyError as e:
+            logger.warning(constants.REPLICAS_LOG_NOT_AVAILABLE.format(url=self.engine.url, error=e))
+            self.lag_seconds = None
+
+    def mark_unavailable(self):
+        """ Skip the replica until its next lag check. """
+        self.lag_seconds = None
+
+
+_replicas = [_Replica(url) for url in settings.DATABASE_REPLICA_URLS]
+
+
+def replica_lag_loop():
+    """
+    Check replication lag of all replicas every `REPLICA_LAG_CHECK_SECONDS`, so requests never wait on it.
+    Intended to run in a background thread.
+    """
+    while True:
+        for replica in _replicas:
+            replica.check_lag()
+        time.sleep(settings.REPLICA_LAG_CHECK_SECONDS)
+
+
+def _read_your_writes_seconds() -> float:
+    # lag of a used replica is at most the staleness tolerance plus its growth since the last check
+    return settings.REPLICA_MAX_STALENESS_SECONDS + settings.REPLICA_LAG_CHECK_SECONDS
+
+
+def mark_written(username: str):
+    """
+    Route reads of the user to the primary until replicas surely caught up with their write,
+    in all workers.
+
+    :param username: username of the user whose data was written
+    """
+    if _replicas:
+        get_cache().set(READ_YOUR_WRITES_NAMESPACE, username, b"1", _read_your_writes_seconds())
+
+
+def _select_replica(username: str | None) -> _Replica | None:
+    """
+    Select a replica within `REPLICA_MAX_STALENESS_SECONDS` for a read of the user.
+
+    :param username: username of the user whose data is read (optional)
+    :return: `_Replica`, or None if the read must go to the primary
+    """
+    if not _replicas:
+        return None
+    if username and get_cache().get(READ_YOUR_WRITES_NAMESPACE, username) is not None:
+        return None
+
+    for replica in random.sample(_replicas, len(_replicas)):
+        lag = replica.lag_seconds
+        if lag is not None and lag <= settings.REPLICA_MAX_STALENESS_SECONDS:
+            return replica
+
+    return None
+
+
+def get_read_engine(username: str | None = None) -> Engine:
+    """
+    Get engine for a read-only connection: a fresh enough replica, otherwise the primary.
+
+    :param username: username of the user whose data is read, for read-your-writes (optional)
+    :return: replica or primary `Engine`
+    """
+    replica = _select_replica(username)
+
+    return replica.engine if replica else engine
+
+
+@contextmanager
+def read_session(username: str | None = None) -> Iterator[Session]:
+    """
+    Open a session for read-only work on a fresh enough replica.
+
+    Falls back to the primary if no replica is within `REPLICA_MAX_STALENESS_SECONDS`,
+    if the user wrote data recently, or if connecting to the selected replica fails.
+    Without `DATABASE_REPLICA_URLS` configured, all reads go to the primary.
+
+    :param username: username of the user whose data is read, for read-your-writes (optional)
+    :return: iterator yielding `Session`
+    """
+    replica = _select_replica(username)
+    if replica:
+        session = Session(replica.engine)
+        try:
+            session.connection()
+        except SQLAlchemyError as e:
+            logger.warning(constants.REPLICAS_LOG_CONNECT_FAILED.format(url=replica.engine.url, error=e))
+            replica.mark_unavailable()
+            session.close()
+            replica = None
+
+    if not replica:
+        session = Session(engine)
+
+    with session:
+        yield session
+
+
+def get_read_session():
+    """ Provides read-only `Session` instance, on a replica if one is fresh enough. """
+    with read_session() as session:
+        yield session
@@ -8,8 +8,9 @@ from jwt import InvalidTokenError
 from passlib.context import CryptContext
 from sqlmodel import select
 
+from src.helsa.core import constants
 from src.helsa.core.config import settings
-from src.helsa.core.types import DBSessionDependency
+from src.helsa.core.replicas import read_session
 from src.helsa.models.security import TokenData
 from src.helsa.models.user import User
 
@@ -56,15 +57,15 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: DBSessionDependency
-):
+def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """
     Validate the token and verify it belongs to a registered user saved in db.
 
+    The user is read from a replica if one is fresh enough, see `read_session`,
+    and returned detached, to be used with any session. Not `async`, so FastAPI runs
+    the blocking db read in its threadpool instead of on the event loop.
+
     :param token: `OAuth2` access token passed in the `Authorization header` as a `Bearer` token.
-    :param session: db `Session` instance
     :return: `User` instance obtained from db
     :raise: `HTTPException` with 401 status code when token is invalid or does
     not belong to a registered user.
@@ -84,8 +85,35 @@ async def get_current_user(
     except InvalidTokenError:
         raise credentials_exception
 
-    user = session.exec(select(User).where(User.username == token_data.username)).first()
-    if user is None:
-        raise credentials_exception
+    with read_session(token_data.username) as session:
+        user = session.exec(select(User).where(User.username == token_data.username)).first()
+        if user is None:
+            raise credentials_exception
+        session.expunge(user)
+
+    return user
+
+
+def get_current_admin_user(current_user: Annotated[User, Depends(get_current_user)]):
+    """
+    Verify the current user is an admin.
 
-    return user
\ No newline at end of file
+    :param current_user: current `User` instance
+    :return: current `User` instance
+    :raise: `HTTPException` with 403 status code when the user is not an admin.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=constants.SECURITY_EXC_MSG_ADMIN_REQUIRED)
+
+    return current_user
+
+
+def get_user_read_session(current_user: Annotated[User, Depends(get_current_user)]):
+    """
+    Provides read-only `Session` instance for reading data of the current user,
+    on a replica if one is fresh enough and the user did not write data recently.
+
+    :param current_user: current `User` instance
+    """
+    with read_session(current_user.username) as session:
+        yield session
@@ -3,6 +3,10 @@ from typing import Annotated
 from fastapi import Depends
 from sqlmodel import Session
 
+from src.helsa.core.replicas import get_read_session
+from src.helsa.core.security import get_user_read_session
 from src.helsa.database import get_session
 
-DBSessionDependency = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+DBSessionDependency = Annotated[Session, Depends(get_session)]
+DBReadSessionDependency = Annotated[Session, Depends(get_read_session)]
+DBUserReadSessionDependency = Annotated[Session, Depends(get_user_read_session)]
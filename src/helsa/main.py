@@ -1,15 +1,24 @@
 import os
+import threading
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.requests import Request
 
+from src.helsa.core.admission import AdmissionControlMiddleware
 from src.helsa.core.config import settings
 from src.helsa.core.exceptions import exception_response
 from src.helsa.core.logging import logger
+from src.helsa.core.profiling import ProfilingMiddleware
+from src.helsa.core.replicas import replica_lag_loop
 from src.helsa.database import create_db_and_tables
-from src.helsa.routers import access, diagnose, admin
+from src.helsa.routers import access, diagnose, admin, history
+from src.helsa.services import constants
+from src.helsa.services.partition_service import ensure_search_partitions, partition_maintenance_loop
+from src.helsa.services.retention_service import retention_loop
+from src.helsa.services.similarity_service import similarity_index_loop
+from src.helsa.services.usage_service import usage_flush_loop, flush_usage
 
 
 os.makedirs(settings.UPLOADS_DIRECTORY, exist_ok=True)
@@ -18,7 +27,20 @@ os.makedirs(settings.UPLOADS_DIRECTORY, exist_ok=True)
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     create_db_and_tables()
+    ensure_search_partitions()
+    threading.Thread(target=partition_maintenance_loop, daemon=True).start()
+    if settings.DATABASE_REPLICA_URLS:
+        threading.Thread(target=replica_lag_loop, daemon=True).start()
+    if settings.SIMILARITY_INDEX_ENABLED:
+        threading.Thread(target=similarity_index_loop, daemon=True).start()
+    if settings.RETENTION_ENABLED:
+        threading.Thread(target=retention_loop, daemon=True).start()
+    threading.Thread(target=usage_flush_loop, daemon=True).start()
     yield
+    try:
+        flush_usage()
+    except Exception as e:
+        logger.error(constants.USAGE_SERVICE_LOG_SHUTDOWN_FLUSH_FAILED + ": " + str(e), exc_info=True)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -26,6 +48,12 @@ app = FastAPI(lifespan=lifespan)
 app.include_router(access.router)
 app.include_router(diagnose.router)
 app.include_router(admin.router)
+app.include_router(history.router)
+
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
 
 
 @app.exception_handler(Exception)
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+
+
+class AdmissionRouteClass(BaseModel):
+    """
+    Class of routes sharing a concurrency limit. Requests above the limit wait in a bounded queue,
+    requests which do not fit into the queue or time out waiting are rejected.
+    An empty list of path prefixes matches any route.
+    """
+    name: str
+    path_prefixes: list[str] = []
+    max_concurrency: int = Field(gt=0)
+    max_queue: int = Field(ge=0, default=0)
+    queue_timeout_seconds: float = Field(ge=0, default=0)
+    retry_after_seconds: int = Field(ge=0, default=5)
+
+
+class AdmissionStatus(BaseModel):
+    """ Current load of a route class in the worker serving the request. """
+    name: str
+    in_flight: int
+    queued: int
+    max_concurrency: int
+    max_queue: int
+    rejected: int
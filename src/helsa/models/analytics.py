@@ -0,0 +1,78 @@
+import uuid
+from datetime import date
+
+from pydantic import BaseModel
+from sqlalchemy import BigInteger
+from sqlmodel import SQLModel, Field
+
+from src.helsa.models.consultation import ResponseTone, LanguageStyle
+
+
+class SearchDailyRollup(SQLModel, table=True):
+    """
+    DB model defining daily search counts per user tier, saved into the `searchdailyrollup` table.
+
+    Rows are incremented from the in-memory buffer of saved searches in batches, see `usage_service`,
+    so reading them never touches the raw search tables.
+    """
+    day: date = Field(primary_key=True)
+    has_premium_tier: bool = Field(primary_key=True)
+    search_count: int = Field(default=0, nullable=False)
+    searches_with_images_count: int = Field(default=0, nullable=False)
+    image_count: int = Field(default=0, nullable=False)
+
+
+class SearchStyleDailyRollup(SQLModel, table=True):
+    """ DB model defining daily search counts split by requested response tone and language style. """
+    day: date = Field(primary_key=True)
+    response_tone: ResponseTone = Field(primary_key=True)
+    language_style: LanguageStyle = Field(primary_key=True)
+    search_count: int = Field(default=0, nullable=False)
+
+
+class DiagnoseDailyRollup(SQLModel, table=True):
+    """ DB model defining daily counts of diagnoses by their normalized (lowercase) name. """
+    day: date = Field(primary_key=True)
+    name: str = Field(primary_key=True)
+    diagnose_count: int = Field(default=0, nullable=False)
+
+
+class UserUsageDailyRollup(SQLModel, table=True):
+    """
+    DB model defining daily upstream model usage per user, tier and model.
+
+    Rows are incremented from the in-memory buffer of saved searches in batches, see `usage_service`.
+    Latency is a sum, divide it by `search_count` for the average.
+    """
+    day: date = Field(primary_key=True)
+    user_id: uuid.UUID = Field(primary_key=True, foreign_key="user.id", index=True)
+    has_premium_tier: bool = Field(primary_key=True)
+    model: str = Field(primary_key=True)
+    search_count: int = Field(default=0, nullable=False)
+    searches_with_images_count: int = Field(default=0, nullable=False)
+    image_count: int = Field(default=0, nullable=False)
+    input_tokens: int = Field(default=0, nullable=False, sa_type=BigInteger)
+    output_tokens: int = Field(default=0, nullable=False, sa_type=BigInteger)
+    image_tokens: int = Field(default=0, nullable=False, sa_type=BigInteger)
+    upstream_latency_ms: int = Field(default=0, nullable=False, sa_type=BigInteger)
+
+
+class UserUsage(BaseModel):
+    """ Response model for upstream model usage of a user over a period. """
+    username: str
+    has_premium_tier: bool
+    search_count: int
+    searches_with_images_count: int
+    image_count: int
+    input_tokens: int
+    output_tokens: int
+    image_tokens: int
+    average_latency_seconds: float
+    active_days: int
+    max_daily_tokens: int
+
+
+class DiagnoseCount(BaseModel):
+    """ Response model for total count of a diagnose over a period. """
+    name: str
+    count: int
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import Column, LargeBinary, DateTime, func
+from sqlmodel import SQLModel, Field
+
+
+class CacheEntry(SQLModel, table=True):
+    """
+    DB model defining entry of the shared cache saved into the unlogged `cacheentry` table.
+
+    Unlogged tables skip the write-ahead log, so writes are cheap and the table is emptied
+    after a crash, which is fine for a cache. Entry is valid only while its `version` equals
+    the current version of its namespace. Above the entry limit, entries are evicted in order of `stored_at`.
+    """
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    namespace: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    version: int = Field(nullable=False)
+    value: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    expires_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False, index=True))
+    stored_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True, server_default=func.now())
+    )
+
+
+class CacheNamespace(SQLModel, table=True):
+    """ DB model defining current version of a shared cache namespace, bumped to invalidate all its entries. """
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    namespace: str = Field(primary_key=True)
+    version: int = Field(default=0, nullable=False)
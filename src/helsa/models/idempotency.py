@@ -0,0 +1,22 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    DB model defining `Idempotency-Key` of a user saved into the `idempotencykey` table.
+
+    A key is claimed by inserting its row, the primary key over user and key lets only one request
+    with the key be processed across all workers and hosts. The key is completed with the id of
+    the saved search in the same transaction as the search, so a committed search is never processed
+    again. A claim not completed until `claimed_until`, e.g. of a crashed worker, can be taken over.
+    Keys past `expires_at` are treated as unused and purged by retention.
+    """
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    key: str = Field(max_length=255, primary_key=True)
+    fingerprint: str = Field(nullable=False)
+    search_id: uuid.UUID | None = Field(default=None, nullable=True)
+    claimed_until: datetime = Field(nullable=False)
+    expires_at: datetime = Field(nullable=False, index=True)
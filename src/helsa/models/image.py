@@ -0,0 +1,11 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+StoragePresetName = Literal["original", "fast", "balanced", "compact"]
+
+
+class StoragePreset(BaseModel):
+    """ Format and encoder options used for saving uploaded images. """
+    format: str | None
+    options: dict
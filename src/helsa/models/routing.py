@@ -0,0 +1,35 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class ModelRoute(BaseModel):
+    """
+    Rule of the model routing table: conditions on request features and model parameters used
+    when all conditions match. Unset conditions match any request.
+    """
+    name: str
+    model: str
+    fallback_model: str | None = None
+    timeout_seconds: float = Field(gt=0, default=60)
+    # timeout of the fallback model, a request takes at most `timeout_seconds` + `fallback_timeout_seconds`
+    fallback_timeout_seconds: float = Field(gt=0, default=30)
+    image_detail: Literal["low", "high", "auto"] = "high"
+    # conditions
+    has_images: bool | None = None
+    has_premium_tier: bool | None = None
+    max_symptoms_length: int | None = None
+    max_observed_latency_seconds: float | None = None
+
+
+class ModelUsage(BaseModel):
+    """
+    Upstream usage of a diagnose request: model which produced the response, its tokens and latency
+    of the whole request, including a failed attempt of the primary model before falling back.
+    """
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # part of `input_tokens`, estimated, see `estimate_image_tokens`
+    image_tokens: int = 0
+    latency_seconds: float = 0.0
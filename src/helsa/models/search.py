@@ -1,10 +1,15 @@
 import uuid
 from datetime import datetime, timezone
+from enum import Enum
 from typing import List
 
+from pydantic import BaseModel
+from sqlalchemy import Column, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import SQLModel, Field, Relationship
 
-from src.helsa.models.consultation import ResponseTone, LanguageStyle
+from src.helsa.core.ids import uuid7
+from src.helsa.models.consultation import ResponseTone, LanguageStyle, SexAssignedAtBirth
 
 
 class Search(SQLModel, table=True):
@@ -15,29 +20,53 @@ class Search(SQLModel, table=True):
         * zero or more searches for one user
         * zero or more search images for one search
         * zero or more diagnoses for one search
+
+    Column `search_vector` holds full-text document built from symptoms and diagnoses
+    on save, indexed with a GIN index for searching in user's history.
+
+    The table is partitioned by month of creation: ids are UUIDv7 holding `created_at`,
+    so month partitions are ranges of ids, see `partition_service`.
     """
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_search_search_vector", "search_vector", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (id)"},
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     symptoms: str = Field(nullable=False)
     diagnoses: list["SearchDiagnose"] = Relationship(back_populates="search", cascade_delete=True)
     patient_age_years: int | None = Field(nullable=True)
+    saab: SexAssignedAtBirth | None = Field(default=None, nullable=True)
+    duration: str | None = Field(default=None, nullable=True)
     response_tone: ResponseTone = Field(nullable=False)
     language_style: LanguageStyle = Field(nullable=False)
-    user_id: uuid.UUID = Field(foreign_key="user.id")
+    user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
     user: "User" = Relationship(back_populates="searches")
     images: List["SearchImage"] | None = Relationship(back_populates="search", cascade_delete=True)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+    model_route: str | None = Field(default=None, nullable=True)
+    model: str | None = Field(default=None, nullable=True)
+    input_tokens: int | None = Field(default=None, nullable=True)
+    output_tokens: int | None = Field(default=None, nullable=True)
+    image_tokens: int | None = Field(default=None, nullable=True)
+    upstream_latency_ms: int | None = Field(default=None, nullable=True)
+    search_vector: str | None = Field(default=None, sa_column=Column(TSVECTOR, nullable=True))
 
 
 class SearchDiagnose(SQLModel, table=True):
     """
     DB model defining diagnose related to a `Search` model and its attributes.
     Each search diagnose belongs to one specific search.
+
+    The table is partitioned by `search_id` with the same month ranges as `search`.
     """
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (search_id)"}
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(nullable=False)
     description: str = Field(nullable=False)
     recommended_action: str = Field(nullable=False)
-    search_id: uuid.UUID = Field(foreign_key="search.id")
+    search_id: uuid.UUID = Field(foreign_key="search.id", primary_key=True, index=True)
     search: Search = Relationship(back_populates="diagnoses")
 
 
@@ -45,10 +74,62 @@ class SearchImage(SQLModel, table=True):
     """
     DB model defining image related to a `Search` model and its attributes.
     Each search image belongs to one specific search.
+
+    The table is partitioned by `search_id` with the same month ranges as `search`.
     """
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (search_id)"}
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     image_src: str = Field(nullable=False)
     width: int = Field(nullable=False)
     height: int = Field(nullable=False)
-    search_id: uuid.UUID = Field(foreign_key="search.id")
+    search_id: uuid.UUID = Field(foreign_key="search.id", primary_key=True, index=True)
     search: Search = Relationship(back_populates="images")
+
+
+class SearchImageFileDeletion(SQLModel, table=True):
+    """
+    DB model defining image file queued for removal from disk after its `SearchImage` was purged.
+
+    Rows are inserted in the same transaction that deletes the image rows and removed once
+    the file is gone, so an interrupted purge leaves no orphaned files behind.
+    """
+    id: int | None = Field(default=None, primary_key=True)
+    image_src: str = Field(nullable=False)
+
+
+class SearchHistoryHit(BaseModel):
+    """ Response model of a single past search matching the full-text query. """
+    id: uuid.UUID
+    symptoms: str
+    diagnoses: List[str]
+    created_at: datetime
+    rank: float
+
+
+class SearchHistoryPage(BaseModel):
+    """ Response model of one page of full-text search results with cursor for the next page. """
+    items: List[SearchHistoryHit]
+    next_cursor: str | None = None
+
+
+class SimilarSearch(BaseModel):
+    """ Response model of a past search similar to the requested symptoms. """
+    id: uuid.UUID
+    symptoms: str
+    diagnoses: List[str]
+    created_at: datetime
+    similarity: float
+
+
+class RetentionResult(BaseModel):
+    """ Summary of one run of purging expired searches. """
+    searches_deleted: int = 0
+    files_removed: int = 0
+
+
+class ExportFormat(str, Enum):
+    """ Format of exported consultation history """
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ZIP = "zip"
@@ -1,12 +1,34 @@
+import uuid
+from datetime import datetime
+
 from pydantic import BaseModel
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import SQLModel, Field
 
 
 class Token(BaseModel):
     """ Standard response format for authentication endpoint. """
     access_token: str
     token_type: str
+    refresh_token: str | None = None
 
 
 class TokenData(BaseModel):
     """ Wrapper model for token data. """
     username: str | None = None
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    DB model defining refresh token saved into the `refreshtoken` table.
+
+    Only SHA-256 digest of the token is stored, looked up by a unique index. Each use rotates
+    the token: the used one is revoked and a new one of the same family is issued. Use of
+    an already revoked token revokes the whole family.
+    """
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    token_hash: bytes = Field(sa_column=Column(LargeBinary(32), nullable=False, unique=True, index=True))
+    family_id: uuid.UUID = Field(nullable=False, index=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, index=True)
+    expires_at: datetime = Field(nullable=False, index=True)
+    revoked_at: datetime | None = Field(default=None, nullable=True)
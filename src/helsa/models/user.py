@@ -62,3 +62,29 @@ class UserFlagsRequest(BaseModel):
     """ Request model for setting user flags on user. """
     username: EmailStr
     user_flags: UserFlags
+
+
+class UserFlagsFailure(BaseModel):
+    """ Failure of a single entry within a bulk user flags update. """
+    line: int | None = None
+    username: str | None = None
+    error: str
+
+
+class UserFlagsBulkResult(BaseModel):
+    """ Response model summarizing a bulk user flags update. """
+    updated: int = 0
+    failed: List[UserFlagsFailure] = []
+
+
+class UserCreateFailure(BaseModel):
+    """ Failure of a single entry within a bulk user provisioning. """
+    line: int | None = None
+    username: str | None = None
+    error: str
+
+
+class UserCreateBulkResult(BaseModel):
+    """ Response model summarizing a bulk user provisioning. """
+    created: int = 0
+    failed: List[UserCreateFailure] = []
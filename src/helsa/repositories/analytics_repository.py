@@ -0,0 +1,279 @@
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import Date, cast, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, SQLModel, select, col
+
+from src.helsa.models.analytics import (
+    SearchDailyRollup, SearchStyleDailyRollup, DiagnoseDailyRollup, DiagnoseCount, UserUsageDailyRollup, UserUsage
+)
+from src.helsa.models.search import Search, SearchDiagnose, SearchImage
+from src.helsa.models.user import User
+
+USAGE_ROLLUP_KEY = ("day", "user_id", "has_premium_tier", "model")
+USAGE_ROLLUP_COUNTERS = (
+    "search_count", "searches_with_images_count", "image_count",
+    "input_tokens", "output_tokens", "image_tokens", "upstream_latency_ms"
+)
+# key and counter columns of each rollup
+ROLLUP_COLUMNS: dict[type[SQLModel], tuple[tuple[str, ...], tuple[str, ...]]] = {
+    SearchDailyRollup: (("day", "has_premium_tier"), ("search_count", "searches_with_images_count", "image_count")),
+    SearchStyleDailyRollup: (("day", "response_tone", "language_style"), ("search_count",)),
+    DiagnoseDailyRollup: (("day", "name"), ("diagnose_count",)),
+    UserUsageDailyRollup: (USAGE_ROLLUP_KEY, USAGE_ROLLUP_COUNTERS),
+}
+
+
+def _normalize_diagnose_name(name: str) -> str:
+    """
+    Normalize diagnose name so that the same diagnose is counted under one key.
+
+    :param name: diagnose name as returned by AI
+    :return: stripped, lowercase name with collapsed whitespace
+    """
+    return " ".join(name.split()).lower()
+
+
+def get_search_rollup_increments(search: Search, user: User) -> list[tuple[type[SQLModel], tuple, Counter]]:
+    """
+    Get increments of daily search, style and diagnose rollups by a new search.
+
+    :param search: saved `Search`
+    :param user: owner of the search
+    :return: list of tuples with rollup model, values of its key columns and increments of its counters
+    """
+    day = search.created_at.date()
+    image_count = len(search.images or [])
+    increments = [
+        (SearchDailyRollup, (day, user.has_premium_tier), Counter(
+            search_count=1, searches_with_images_count=1 if image_count else 0, image_count=image_count
+        )),
+        (SearchStyleDailyRollup, (day, search.response_tone, search.language_style), Counter(search_count=1)),
+    ]
+    diagnose_counts = Counter(_normalize_diagnose_name(diagnose.name) for diagnose in search.diagnoses)
+    increments.extend(
+        (DiagnoseDailyRollup, (day, name), Counter(diagnose_count=count)) for name, count in diagnose_counts.items()
+    )
+
+    return increments
+
+
+def increment_rollups(model: type[SQLModel], rows: list[dict], session: Session):
+    """
+    Add buffered counts to rollup rows with a single `INSERT ... ON CONFLICT DO UPDATE`
+    in the session's current transaction.
+
+    :param model: rollup model, one of `ROLLUP_COLUMNS`
+    :param rows: values of key and counter columns, each key at most once
+    :param session: db `Session` instance
+    """
+    key, counters = ROLLUP_COLUMNS[model]
+    statement = insert(model).values(
+        # sorted to take row locks in a consistent order across concurrent transactions
+        sorted(rows, key=lambda row: tuple(row[name] for name in key))
+    )
+    session.connection().execute(statement.on_conflict_do_update(
+        index_elements=[getattr(model, name) for name in key],
+        set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in counters}
+    ))
+
+
+def _backfill_rollup(model: type[SQLModel], source, session: Session) -> int:
+    """
+    Upsert rollup rows recounted from saved searches with a single `INSERT ... SELECT ... ON CONFLICT DO UPDATE`.
+
+    Each counter is set to the greater of its current value and the recount: rows of days whose searches
+    were partly purged by retention keep their counts, rows missing the searches saved before rollups
+    were introduced are completed, and running the backfill again changes nothing.
+
+    :param model: rollup model, one of `ROLLUP_COLUMNS`
+    :param source: select of values of key and counter columns, in the order of `ROLLUP_COLUMNS`
+    :param session: db `Session` instance
+    :return: count of upserted rows
+    """
+    key, counters = ROLLUP_COLUMNS[model]
+    statement = insert(model).from_select([*key, *counters], source)
+    statement = statement.on_conflict_do_update(
+        index_elements=[getattr(model, name) for name in key],
+        set_={name: func.greatest(getattr(model, name), getattr(statement.excluded, name)) for name in counters}
+    )
+
+    return session.connection().execute(statement).rowcount
+
+
+def backfill_search_rollups(session: Session) -> int:
+    """
+    Rebuild daily search, style, diagnose and usage rollups from saved searches, e.g. for searches
+    saved before the rollups were introduced. The change is committed by the caller.
+
+    Searches are counted under the current tier of their owner. Only days before today (UTC) are recounted,
+    searches of today may still be buffered in workers, see `usage_service`.
+
+    :param session: db `Session` instance
+    :return: count of upserted rollup rows
+    """
+    day = cast(func.date_trunc("day", col(Search.created_at)), Date).label("day")
+    before_today = col(Search.created_at) < func.date_trunc("day", func.timezone("UTC", func.now()))
+    image_counts = (
+        select(SearchImage.search_id, func.count().label("image_count"))
+        .group_by(col(SearchImage.search_id))
+        .subquery()
+    )
+    image_count = func.coalesce(image_counts.c.image_count, 0)
+    searches = (
+        select()
+        .select_from(Search)
+        .join(User, col(Search.user_id) == col(User.id))
+        .outerjoin(image_counts, image_counts.c.search_id == col(Search.id))
+        .where(before_today)
+    )
+    image_counters = (func.count(), func.count().filter(image_count > 0), func.coalesce(func.sum(image_count), 0))
+
+    upserted = _backfill_rollup(
+        SearchDailyRollup,
+        searches.add_columns(day, col(User.has_premium_tier), *image_counters).group_by(day, col(User.has_premium_tier)),
+        session
+    )
+    upserted += _backfill_rollup(
+        SearchStyleDailyRollup,
+        select(day, col(Search.response_tone), col(Search.language_style), func.count())
+        .where(before_today)
+        .group_by(day, col(Search.response_tone), col(Search.language_style)),
+        session
+    )
+    # same normalization as `_normalize_diagnose_name`
+    name = func.lower(func.btrim(func.regexp_replace(col(SearchDiagnose.name), r"\s+", " ", "g"))).label("name")
+    upserted += _backfill_rollup(
+        DiagnoseDailyRollup,
+        select(day, name, func.count())
+        .select_from(SearchDiagnose)
+        .join(Search, col(SearchDiagnose.search_id) == col(Search.id))
+        .where(before_today)
+        .group_by(day, name),
+        session
+    )
+    upserted += _backfill_rollup(
+        UserUsageDailyRollup,
+        searches.add_columns(
+            day, col(Search.user_id), col(User.has_premium_tier), col(Search.model), *image_counters,
+            *(
+                func.coalesce(func.sum(getattr(Search, name)), 0)
+                for name in ("input_tokens", "output_tokens", "image_tokens", "upstream_latency_ms")
+            )
+        )
+        .where(col(Search.model).is_not(None))
+        .group_by(day, col(Search.user_id), col(User.has_premium_tier), col(Search.model)),
+        session
+    )
+
+    return upserted
+
+
+def get_search_daily_rollups(date_from: date, date_to: date, session: Session) -> list[SearchDailyRollup]:
+    """
+    Get daily search counts per tier within the given date range (inclusive).
+
+    :param date_from: first day of the range
+    :param date_to: last day of the range
+    :param session: db `Session` instance
+    :return: list of `SearchDailyRollup` rows ordered by day
+    """
+    return list(session.exec(
+        select(SearchDailyRollup)
+        .where(SearchDailyRollup.day >= date_from, SearchDailyRollup.day <= date_to)
+        .order_by(col(SearchDailyRollup.day), col(SearchDailyRollup.has_premium_tier))
+    ))
+
+
+def get_search_style_daily_rollups(date_from: date, date_to: date, session: Session) -> list[SearchStyleDailyRollup]:
+    """
+    Get daily search counts split by response tone and language style within the given date range (inclusive).
+
+    :param date_from: first day of the range
+    :param date_to: last day of the range
+    :param session: db `Session` instance
+    :return: list of `SearchStyleDailyRollup` rows ordered by day
+    """
+    return list(session.exec(
+        select(SearchStyleDailyRollup)
+        .where(SearchStyleDailyRollup.day >= date_from, SearchStyleDailyRollup.day <= date_to)
+        .order_by(col(SearchStyleDailyRollup.day))
+    ))
+
+
+def get_top_diagnoses(date_from: date, date_to: date, limit: int, session: Session) -> list[DiagnoseCount]:
+    """
+    Get the most frequent diagnoses within the given date range (inclusive).
+
+    :param date_from: first day of the range
+    :param date_to: last day of the range
+    :param limit: maximum count of returned diagnoses
+    :param session: db `Session` instance
+    :return: list of `DiagnoseCount` ordered from the most frequent
+    """
+    total = func.sum(DiagnoseDailyRollup.diagnose_count).label("total")
+    rows = session.exec(
+        select(DiagnoseDailyRollup.name, total)
+        .where(DiagnoseDailyRollup.day >= date_from, DiagnoseDailyRollup.day <= date_to)
+        .group_by(col(DiagnoseDailyRollup.name))
+        .order_by(total.desc(), col(DiagnoseDailyRollup.name))
+        .limit(limit)
+    )
+    return [DiagnoseCount(name=name, count=count) for name, count in rows]
+
+
+def get_user_usage(
+        date_from: date,
+        date_to: date,
+        has_premium_tier: bool | None,
+        limit: int,
+        session: Session
+) -> list[UserUsage]:
+    """
+    Get upstream model usage of the heaviest users within the given date range (inclusive).
+
+    :param date_from: first day of the range
+    :param date_to: last day of the range
+    :param has_premium_tier: count only searches made with (True) or without (False) premium tier (optional)
+    :param limit: maximum count of returned users
+    :param session: db `Session` instance
+    :return: list of `UserUsage` ordered by total tokens, from the heaviest user
+    """
+    statement = (
+        select(
+            UserUsageDailyRollup.user_id,
+            UserUsageDailyRollup.day,
+            *[func.sum(getattr(UserUsageDailyRollup, name)).label(name) for name in USAGE_ROLLUP_COUNTERS]
+        )
+        .where(UserUsageDailyRollup.day >= date_from, UserUsageDailyRollup.day <= date_to)
+        .group_by(col(UserUsageDailyRollup.user_id), col(UserUsageDailyRollup.day))
+    )
+    if has_premium_tier is not None:
+        statement = statement.where(UserUsageDailyRollup.has_premium_tier == has_premium_tier)
+    daily = statement.subquery("daily")
+
+    daily_tokens = daily.c.input_tokens + daily.c.output_tokens
+    total_tokens = func.sum(daily_tokens)
+    rows = session.exec(
+        select(
+            User.username,
+            User.has_premium_tier,
+            *[func.sum(daily.c[name]).label(name) for name in USAGE_ROLLUP_COUNTERS],
+            func.count().label("active_days"),
+            func.max(daily_tokens).label("max_daily_tokens")
+        )
+        .join(daily, daily.c.user_id == User.id)
+        .group_by(col(User.id))
+        .order_by(total_tokens.desc(), col(User.username))
+        .limit(limit)
+    ).mappings()
+
+    return [
+        UserUsage(
+            **{name: row[name] for name in ("username", "has_premium_tier", "active_days", "max_daily_tokens")},
+            **{name: row[name] for name in USAGE_ROLLUP_COUNTERS if name != "upstream_latency_ms"},
+            average_latency_seconds=row["upstream_latency_ms"] / row["search_count"] / 1000
+        )
+        for row in rows
+    ]
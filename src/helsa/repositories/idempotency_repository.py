@@ -0,0 +1,150 @@
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import delete, func, update, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, select
+
+from src.helsa.models.idempotency import IdempotencyKey
+
+
+def claim_idempotency_key(
+        user_id: uuid.UUID,
+        key: str,
+        fingerprint: str,
+        claim_seconds: int,
+        expire_seconds: int,
+        session: Session
+) -> bool:
+    """
+    Claim the key with a single `INSERT ... ON CONFLICT DO UPDATE`, taking over an expired key
+    or a claim which was not completed in time. The change is committed by the caller.
+
+    :param user_id: id of the user making the request
+    :param key: value of the `Idempotency-Key` header
+    :param fingerprint: fingerprint of the request
+    :param claim_seconds: seconds until the claim can be taken over if it is not completed
+    :param expire_seconds: seconds until the key expires
+    :param session: db `Session` instance
+    :return: True if the key was claimed, False if it is in use
+    """
+    statement = insert(IdempotencyKey).values(
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        search_id=None,
+        claimed_until=func.now() + timedelta(seconds=claim_seconds),
+        expires_at=func.now() + timedelta(seconds=expire_seconds)
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={
+            "fingerprint": statement.excluded.fingerprint,
+            "search_id": None,
+            "claimed_until": statement.excluded.claimed_until,
+            "expires_at": statement.excluded.expires_at
+        },
+        where=(col(IdempotencyKey.expires_at) <= func.now())
+        | (col(IdempotencyKey.search_id).is_(None) & (col(IdempotencyKey.claimed_until) <= func.now()))
+    ).returning(col(IdempotencyKey.key))
+
+    return session.connection().execute(statement).first() is not None
+
+
+def reclaim_idempotency_key(
+        user_id: uuid.UUID,
+        key: str,
+        fingerprint: str,
+        search_id: uuid.UUID,
+        claim_seconds: int,
+        session: Session
+) -> bool:
+    """
+    Claim again a completed key whose search no longer exists, e.g. purged by retention.
+    The change is committed by the caller.
+
+    :param user_id: id of the user making the request
+    :param key: value of the `Idempotency-Key` header
+    :param fingerprint: fingerprint of the request
+    :param search_id: id of the missing search the key was completed with
+    :param claim_seconds: seconds until the claim can be taken over if it is not completed
+    :param session: db `Session` instance
+    :return: True if the key was claimed, False if another request claimed it first
+    """
+    statement = (
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.search_id == search_id)
+        .values(fingerprint=fingerprint, search_id=None, claimed_until=func.now() + timedelta(seconds=claim_seconds))
+    )
+
+    return session.connection().execute(statement).rowcount > 0
+
+
+def get_idempotency_key(user_id: uuid.UUID, key: str, session: Session) -> IdempotencyKey | None:
+    """
+    Get the key if it is not expired.
+
+    :param user_id: id of the user making the request
+    :param key: value of the `Idempotency-Key` header
+    :param session: db `Session` instance
+    :return: `IdempotencyKey`, or None if the key is unused
+    """
+    return session.exec(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now()
+        )
+    ).first()
+
+
+def complete_idempotency_key(user_id: uuid.UUID, key: str, search_id: uuid.UUID, session: Session):
+    """
+    Complete the claimed key with the saved search. The change is committed by the caller,
+    together with the search.
+
+    :param user_id: id of the user making the request
+    :param key: value of the `Idempotency-Key` header
+    :param search_id: id of the saved search holding the response
+    :param session: db `Session` instance
+    """
+    session.connection().execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(search_id=search_id)
+    )
+
+
+def release_idempotency_key(user_id: uuid.UUID, key: str, session: Session):
+    """
+    Release the claimed key for retries, unless it was completed.
+
+    :param user_id: id of the user making the request
+    :param key: value of the `Idempotency-Key` header
+    :param session: db `Session` instance
+    """
+    session.connection().execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, col(IdempotencyKey.search_id).is_(None)
+        )
+    )
+    session.commit()
+
+
+def delete_expired_idempotency_keys(batch_size: int, session: Session) -> int:
+    """
+    Delete one batch of expired idempotency keys.
+
+    :param batch_size: maximum count of deleted keys
+    :param session: db `Session` instance
+    :return: count of deleted keys
+    """
+    expired_keys = (
+        select(IdempotencyKey.user_id, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at < func.now())
+        .limit(batch_size)
+    )
+    deleted = session.connection().execute(
+        delete(IdempotencyKey).where(tuple_(col(IdempotencyKey.user_id), col(IdempotencyKey.key)).in_(expired_keys))
+    ).rowcount
+    session.commit()
+
+    return deleted
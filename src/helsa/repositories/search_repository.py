@@ -0,0 +1,379 @@
+import re
+import uuid
+from datetime import datetime, date, timezone
+from typing import Iterator
+
+from sqlalchemy import func, cast, tuple_, literal, delete, insert, update, or_, Connection, RowMapping, text
+from sqlalchemy.dialects.postgresql import REGCONFIG, REAL
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select, col
+
+from src.helsa.core.config import settings
+from src.helsa.core.ids import uuid7_lower_bound
+from src.helsa.models.search import Search, SearchDiagnose, SearchImage, SearchImageFileDeletion
+from src.helsa.models.user import User
+
+HistoryCursor = tuple[float, datetime, uuid.UUID]
+
+# tables partitioned by month, `search` first as the others follow its id ranges
+SEARCH_PARTITIONED_TABLES = (Search.__tablename__, SearchDiagnose.__tablename__, SearchImage.__tablename__)
+_SEARCH_PARTITION_NAME = re.compile(rf"^{Search.__tablename__}_y(\d{{4}})m(\d{{2}})$")
+
+
+def build_search_vector(symptoms: str, diagnoses_text: str):
+    """
+    Build SQL expression computing full-text document of a search.
+
+    Symptoms are weighted higher (`A`) than diagnoses (`B`), so matches in the patient's
+    own words rank first.
+
+    :param symptoms: symptoms of the search, or SQL expression evaluating to them
+    :param diagnoses_text: names and descriptions of diagnoses of the search joined to one text,
+    or SQL expression evaluating to it
+    :return: SQL expression evaluating to `tsvector`
+    """
+    config = cast(settings.SEARCH_TEXT_SEARCH_CONFIG, REGCONFIG)
+    return func.setweight(func.to_tsvector(config, symptoms), "A").op("||")(
+        func.setweight(func.to_tsvector(config, diagnoses_text), "B")
+    )
+
+
+def backfill_search_vectors_batch(batch_size: int, session: Session) -> int:
+    """
+    Build full-text documents of one batch of searches saved without them, e.g. before full-text search
+    was introduced, in a single `UPDATE`. Searches locked by other transactions are skipped.
+
+    :param batch_size: maximum count of updated searches
+    :param session: db `Session` instance
+    :return: count of updated searches
+    """
+    diagnoses_text = (
+        select(func.coalesce(func.string_agg(SearchDiagnose.name + " " + SearchDiagnose.description, " "), ""))
+        .where(SearchDiagnose.search_id == Search.id)
+        .scalar_subquery()
+    )
+    search_ids = (
+        select(Search.id)
+        .where(col(Search.search_vector).is_(None))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    updated = session.connection().execute(
+        update(Search)
+        .where(col(Search.id).in_(search_ids))
+        .values(search_vector=build_search_vector(col(Search.symptoms), diagnoses_text))
+    ).rowcount
+    session.commit()
+
+    return updated
+
+
+def search_user_history(
+        user_id: uuid.UUID,
+        text: str,
+        limit: int,
+        cursor: HistoryCursor | None,
+        session: Session
+) -> list[tuple[Search, float]]:
+    """
+    Full-text search in searches of one user, ordered by rank, with keyset pagination.
+
+    :param user_id: id of the user owning the searches
+    :param text: query in web search syntax (quoted phrases, `or`, `-` for negation)
+    :param limit: maximum count of returned searches
+    :param cursor: rank, creation time and id of the last search of previous page (optional)
+    :param session: db `Session` instance
+    :return: list of tuples with `Search` (diagnoses loaded) and its rank
+    """
+    query = func.websearch_to_tsquery(cast(settings.SEARCH_TEXT_SEARCH_CONFIG, REGCONFIG), text)
+    rank = func.ts_rank_cd(col(Search.search_vector), query, type_=REAL)
+
+    statement = (
+        select(Search, rank)
+        .where(Search.user_id == user_id, col(Search.search_vector).op("@@")(query))
+        .options(selectinload(Search.diagnoses))
+        .order_by(rank.desc(), col(Search.created_at).desc(), col(Search.id).desc())
+        .limit(limit)
+    )
+    if cursor:
+        last_rank, last_created_at, last_id = cursor
+        statement = statement.where(
+            tuple_(rank, col(Search.created_at), col(Search.id))
+            < tuple_(cast(last_rank, REAL), literal(last_created_at), literal(last_id))
+        )
+
+    return list(session.exec(statement).all())
+
+
+def get_searches_with_diagnoses(search_ids: list[uuid.UUID], session: Session) -> list[Search]:
+    """
+    Get searches by their ids with diagnoses loaded.
+
+    :param search_ids: ids of searches to get
+    :param session: db `Session` instance
+    :return: list of found `Search` instances, in the order of `search_ids`
+    """
+    searches = session.exec(
+        select(Search).where(col(Search.id).in_(search_ids)).options(selectinload(Search.diagnoses))
+    ).all()
+    searches_by_id = {search.id: search for search in searches}
+
+    return [searches_by_id[search_id] for search_id in search_ids if search_id in searches_by_id]
+
+
+def delete_expired_searches_batch(
+        free_tier_cutoff: datetime | None,
+        premium_tier_cutoff: datetime | None,
+        batch_size: int,
+        session: Session
+) -> list[uuid.UUID]:
+    """
+    Delete one batch of expired searches with their diagnoses and images in a single short transaction.
+
+    The batch is picked with `FOR UPDATE SKIP LOCKED`, so concurrent purges never wait on each
+    other, and deleted with set-based `DELETE` statements instead of loading children through
+    the ORM. Paths of deleted images are queued in `SearchImageFileDeletion` in the same transaction.
+
+    :param free_tier_cutoff: searches of free tier users created before this time are expired (optional)
+    :param premium_tier_cutoff: searches of premium tier users created before this time are expired (optional)
+    :param batch_size: maximum count of searches deleted in the batch
+    :param session: db `Session` instance
+    :return: list of ids of deleted searches
+    """
+    expired_conditions = []
+    if free_tier_cutoff:
+        expired_conditions.append(col(User.has_premium_tier).is_(False) & (Search.created_at < free_tier_cutoff))
+    if premium_tier_cutoff:
+        expired_conditions.append(col(User.has_premium_tier).is_(True) & (Search.created_at < premium_tier_cutoff))
+    if not expired_conditions:
+        return []
+
+    search_ids = session.exec(
+        select(Search.id)
+        .join(User, col(Search.user_id) == col(User.id))
+        .where(or_(*expired_conditions))
+        .order_by(col(Search.created_at))
+        .limit(batch_size)
+        .with_for_update(of=Search, skip_locked=True)
+    ).all()
+    if not search_ids:
+        session.rollback()
+        return []
+
+    connection = session.connection()
+    deleted_images = (
+        delete(SearchImage)
+        .where(col(SearchImage.search_id).in_(search_ids))
+        .returning(col(SearchImage.image_src))
+        .cte("deleted_images")
+    )
+    connection.execute(
+        insert(SearchImageFileDeletion)
+        .from_select(["image_src"], select(deleted_images.c.image_src))
+        .add_cte(deleted_images)
+    )
+    connection.execute(delete(SearchDiagnose).where(col(SearchDiagnose.search_id).in_(search_ids)))
+    connection.execute(delete(Search).where(col(Search.id).in_(search_ids)))
+    session.commit()
+
+    return list(search_ids)
+
+
+def get_image_file_deletions(limit: int, session: Session) -> list[SearchImageFileDeletion]:
+    """
+    Get image files queued for removal from disk.
+
+    :param limit: maximum count of returned entries
+    :param session: db `Session` instance
+    :return: list of `SearchImageFileDeletion` entries
+    """
+    return list(session.exec(
+        select(SearchImageFileDeletion).order_by(col(SearchImageFileDeletion.id)).limit(limit)
+    ))
+
+
+def delete_image_file_deletions(deletion_ids: list[int], session: Session):
+    """
+    Remove entries of image files which were removed from disk.
+
+    :param deletion_ids: ids of `SearchImageFileDeletion` entries
+    :param session: db `Session` instance
+    """
+    session.connection().execute(
+        delete(SearchImageFileDeletion).where(col(SearchImageFileDeletion.id).in_(deletion_ids))
+    )
+    session.commit()
+
+
+def stream_user_searches(user_id: uuid.UUID, fetch_size: int, connection: Connection) -> Iterator[RowMapping]:
+    """
+    Stream all searches of a user with nested diagnoses and images, oldest first.
+
+    Rows are read through a server-side cursor in chunks of `fetch_size` and diagnoses and images
+    are aggregated to JSON by the db, so memory use does not grow with the size of the history.
+
+    :param user_id: id of the user owning the searches
+    :param fetch_size: count of rows fetched from the server at once
+    :param connection: db `Connection` kept open while the rows are consumed
+    :return: iterator of rows with search columns and `diagnoses` and `images` JSON lists
+    """
+    empty_json_list = text("'[]'::json")
+    diagnoses = (
+        select(func.coalesce(func.json_agg(func.json_build_object(
+            "name", SearchDiagnose.name,
+            "description", SearchDiagnose.description,
+            "recommended_action", SearchDiagnose.recommended_action
+        )), empty_json_list))
+        .where(SearchDiagnose.search_id == Search.id)
+        .scalar_subquery()
+    )
+    images = (
+        select(func.coalesce(func.json_agg(func.json_build_object(
+            "image_src", SearchImage.image_src,
+            "width", SearchImage.width,
+            "height", SearchImage.height
+        )), empty_json_list))
+        .where(SearchImage.search_id == Search.id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Search.id, Search.created_at, Search.symptoms, Search.patient_age_years,
+            Search.response_tone, Search.language_style,
+            diagnoses.label("diagnoses"), images.label("images")
+        )
+        .where(Search.user_id == user_id)
+        .order_by(col(Search.created_at), col(Search.id))
+    )
+
+    result = connection.execution_options(stream_results=True, yield_per=fetch_size).execute(statement)
+    for partition in result.mappings().partitions():
+        yield from partition
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_y{month.year}m{month.month:02d}"
+
+
+def is_search_partitioned(session: Session) -> bool:
+    """
+    Check the `search` table is partitioned, tables created before partitioning was introduced are not.
+
+    :param session: db `Session` instance
+    :return: True if the table is partitioned, otherwise False
+    """
+    return session.connection().execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table_name))"
+    ), {"table_name": Search.__tablename__}).scalar()
+
+
+def get_search_partition_months(session: Session) -> list[date]:
+    """
+    Get months of existing partitions of the `search` table, including partitions left detached
+    by an interrupted `drop_search_partitions`.
+
+    :param session: db `Session` instance
+    :return: sorted list of first days of the months
+    """
+    partition_names = session.connection().execute(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' "
+        "AND relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = to_regclass(:table_name))"
+    ), {"table_name": Search.__tablename__}).scalars()
+
+    matches = (_SEARCH_PARTITION_NAME.match(name) for name in partition_names)
+    return sorted(date(int(match[1]), int(match[2]), 1) for match in matches if match)
+
+
+def create_search_partitions(month: date, session: Session):
+    """
+    Create partitions of all search tables for the month in the current transaction, if they do not exist yet.
+
+    Ids are UUIDv7, so the month is the range of ids created from its first day (UTC)
+    until the first day of the next month. Diagnoses and images are partitioned by `search_id`
+    with the same ranges.
+
+    :param month: first day of the month
+    :param session: db `Session` instance
+    """
+    lower_bound = uuid7_lower_bound(datetime(month.year, month.month, 1, tzinfo=timezone.utc))
+    next_month = _next_month(month)
+    upper_bound = uuid7_lower_bound(datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc))
+
+    connection = session.connection()
+    for table_name in SEARCH_PARTITIONED_TABLES:
+        # DDL takes no bind parameters, the names and bounds are generated here
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(table_name, month)} PARTITION OF {table_name} "
+            f"FOR VALUES FROM ('{lower_bound}') TO ('{upper_bound}')"
+        ))
+
+
+def _detach_search_partition(table_name: str, partition: str, connection: Connection):
+    """
+    Detach the partition without blocking queries of the table, or finish its detach interrupted before.
+    Partitions already detached or dropped are skipped.
+
+    :param table_name: name of the partitioned table
+    :param partition: name of its partition
+    :param connection: connection in autocommit mode, concurrent detach can not run in a transaction
+    """
+    detach_pending = connection.execute(text(
+        "SELECT inhdetachpending FROM pg_inherits "
+        "WHERE inhrelid = to_regclass(:partition) AND inhparent = to_regclass(:table_name)"
+    ), {"table_name": table_name, "partition": partition}).scalar()
+    if detach_pending is None:
+        return
+
+    connection.execute(text(
+        f"ALTER TABLE {table_name} DETACH PARTITION {partition} {'FINALIZE' if detach_pending else 'CONCURRENTLY'}"
+    ))
+
+
+def drop_search_partitions(month: date, session: Session) -> int:
+    """
+    Drop partitions of all search tables for the month.
+
+    Dropping a partition frees its space at once, without scanning and deleting rows one by one
+    or leaving dead tuples for vacuum. The partitions are first detached concurrently, which waits
+    for queries using them but does not block the parent tables. The detached tables are then dropped
+    in one short transaction, after paths of their images are queued in `SearchImageFileDeletion`.
+    Dropping the foreign keys of diagnoses and images briefly locks `search` exclusively.
+
+    Every step waits for locks at most `SEARCH_PARTITION_LOCK_TIMEOUT_MS`, so queries do not queue
+    behind it for longer. A drop interrupted by the timeout is resumed by calling it again.
+
+    :param month: first day of the month
+    :param session: db `Session` instance, its pending changes are committed first
+    :raise OperationalError: if a lock was not acquired in time
+    :return: count of dropped searches
+    """
+    search_partition = _partition_name(Search.__tablename__, month)
+    diagnose_partition = _partition_name(SearchDiagnose.__tablename__, month)
+    image_partition = _partition_name(SearchImage.__tablename__, month)
+    lock_timeout = {"lock_timeout": f"{settings.SEARCH_PARTITION_LOCK_TIMEOUT_MS}ms"}
+    # the detach waits for transactions using the tables, do not keep one open here
+    session.commit()
+
+    with session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT set_config('lock_timeout', :lock_timeout, false)"), lock_timeout)
+        try:
+            # a partition of `search` can be detached only when no attached partition references it
+            for table_name in reversed(SEARCH_PARTITIONED_TABLES):
+                _detach_search_partition(table_name, _partition_name(table_name, month), connection)
+        finally:
+            connection.execute(text("RESET lock_timeout"))
+
+    connection = session.connection()
+    connection.execute(text("SELECT set_config('lock_timeout', :lock_timeout, true)"), lock_timeout)
+    dropped = connection.execute(text(f"SELECT count(*) FROM {search_partition}")).scalar()
+    connection.execute(text(
+        f"INSERT INTO {SearchImageFileDeletion.__tablename__} (image_src) SELECT image_src FROM {image_partition}"
+    ))
+    connection.execute(text(f"DROP TABLE {diagnose_partition}, {image_partition}, {search_partition}"))
+    session.commit()
+
+    return dropped
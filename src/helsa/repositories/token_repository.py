@@ -0,0 +1,90 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, col, select
+
+from src.helsa.models.security import RefreshToken
+from src.helsa.models.user import User
+
+
+def save_refresh_token(
+        token_hash: bytes,
+        family_id: uuid.UUID,
+        user_id: uuid.UUID,
+        expires_at: datetime,
+        session: Session
+):
+    """
+    Save a new refresh token. The change is committed by the caller.
+
+    :param token_hash: SHA-256 digest of the token
+    :param family_id: id of the token family shared by all rotations of one login
+    :param user_id: id of the token owner
+    :param expires_at: expiration time of the token
+    :param session: db `Session` instance
+    """
+    session.add(RefreshToken(token_hash=token_hash, family_id=family_id, user_id=user_id, expires_at=expires_at))
+
+
+def revoke_valid_refresh_token(token_hash: bytes, session: Session) -> tuple[str, uuid.UUID, uuid.UUID] | None:
+    """
+    Revoke the refresh token if it is valid, in a single indexed `UPDATE ... RETURNING`.
+
+    The update makes concurrent uses of the same token safe, only one of them revokes it.
+
+    :param token_hash: SHA-256 digest of the token
+    :param session: db `Session` instance
+    :return: tuple of owner's username, owner's id and token family id, or None if the token is not valid
+    """
+    statement = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            col(RefreshToken.revoked_at).is_(None),
+            RefreshToken.expires_at > func.now(),
+            RefreshToken.user_id == User.id
+        )
+        .values(revoked_at=func.now())
+        .returning(col(User.username), col(RefreshToken.user_id), col(RefreshToken.family_id))
+    )
+    row = session.connection().execute(statement).first()
+
+    return tuple(row) if row else None
+
+
+def revoke_refresh_token_family(token_hash: bytes, session: Session, reused_only: bool = False) -> int:
+    """
+    Revoke all tokens of the family the given token belongs to, e.g. on logout or token reuse.
+    The change is committed by the caller.
+
+    :param token_hash: SHA-256 digest of any token of the family
+    :param session: db `Session` instance
+    :param reused_only: revoke the family only if the given token was already revoked, i.e. it is being reused
+    :return: count of revoked tokens
+    """
+    family_id = select(RefreshToken.family_id).where(RefreshToken.token_hash == token_hash)
+    if reused_only:
+        family_id = family_id.where(col(RefreshToken.revoked_at).is_not(None))
+    statement = (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id.scalar_subquery(), col(RefreshToken.revoked_at).is_(None))
+        .values(revoked_at=func.now())
+    )
+
+    return session.connection().execute(statement).rowcount
+
+
+def delete_expired_refresh_tokens(batch_size: int, session: Session) -> int:
+    """
+    Delete one batch of expired refresh tokens.
+
+    :param batch_size: maximum count of deleted tokens
+    :param session: db `Session` instance
+    :return: count of deleted tokens
+    """
+    expired_ids = select(RefreshToken.id).where(RefreshToken.expires_at < func.now()).limit(batch_size)
+    deleted = session.connection().execute(delete(RefreshToken).where(col(RefreshToken.id).in_(expired_ids))).rowcount
+    session.commit()
+
+    return deleted
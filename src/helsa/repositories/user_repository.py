@@ -1,6 +1,11 @@
-from sqlmodel import Session, select
+from collections import defaultdict
 
-from src.helsa.models.user import User, UserFlags
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select, col
+
+from src.helsa.core.replicas import mark_written
+from src.helsa.models.user import User, UserFlags, UserFlagsRequest
 
 
 def get_user(username: str, session: Session) -> User:
@@ -16,9 +21,34 @@ def get_user(username: str, session: Session) -> User:
     return user
 
 
+def insert_users(users: list[dict], session: Session) -> set[str]:
+    """
+    Insert new users to the db with a single statement, skipping taken usernames.
+
+    Relies on the unique index on `User.username`: `INSERT ... ON CONFLICT (username) DO NOTHING`
+    needs no preceding lookup and is safe against concurrent registrations of the same username.
+    The transaction is left open for the caller to commit.
+
+    :param users: dicts with `username` and `password_hash` of the users to insert
+    :param session: db `Session` instance
+    :return: set of usernames which were inserted, usernames missing from it already existed
+    """
+    if not users:
+        return set()
+
+    statement = (
+        insert(User)
+        .values([User(**user).model_dump() for user in users])
+        .on_conflict_do_nothing(index_elements=[col(User.username)])
+        .returning(col(User.username))
+    )
+
+    return set(session.connection().execute(statement).scalars())
+
+
 def save_user_flags(user: User, user_flags: UserFlags, session: Session):
     """
-    Save set flags for a user to the db.
+    Save set flags for a user to the db. Reads of the user go to the primary until replicas replay the change.
 
     :param user: user model instance
     :param user_flags: `UserFlags` model instance with user flags set
@@ -28,4 +58,41 @@ def save_user_flags(user: User, user_flags: UserFlags, session: Session):
         setattr(user, key, value)
     session.add(user)
     session.commit()
+    mark_written(user.username)
     session.refresh(user)
+
+
+def save_user_flags_bulk(user_flags_requests: list[UserFlagsRequest], session: Session) -> set[str]:
+    """
+    Save set flags for many users to the db in a single transaction.
+
+    Requests are grouped by their combination of set flags, so every group is applied
+    with one set-based `UPDATE ... WHERE username IN (...)` instead of a lookup and
+    a commit per user. Reads of updated users go to the primary until replicas replay the change.
+
+    :param user_flags_requests: request models with usernames and flags to set
+    :param session: db `Session` instance
+    :return: set of usernames which were found and updated in the db
+    """
+    grouped_usernames: dict[tuple, list[str]] = defaultdict(list)
+    for user_flags_request in user_flags_requests:
+        flags = user_flags_request.user_flags.model_dump(exclude_none=True)
+        grouped_usernames[tuple(sorted(flags.items()))].append(str(user_flags_request.username))
+
+    updated_usernames = set()
+    connection = session.connection()
+    for flags, usernames in grouped_usernames.items():
+        if not flags:
+            continue
+        statement = (
+            update(User)
+            .where(col(User.username).in_(usernames))
+            .values(dict(flags))
+            .returning(col(User.username))
+        )
+        updated_usernames.update(connection.execute(statement).scalars())
+    session.commit()
+    for username in updated_usernames:
+        mark_written(username)
+
+    return updated_usernames
@@ -0,0 +1,20 @@
+"""
+Command line entry point for purging expired searches and their image files once.
+
+Usage (from the project root, with the same environment as the server)::
+
+    python -m src.helsa.retention
+"""
+from src.helsa.database import create_db_and_tables
+from src.helsa.services.partition_service import ensure_search_partitions
+from src.helsa.services.retention_service import run_retention
+
+
+def main():
+    create_db_and_tables()
+    ensure_search_partitions()
+    run_retention()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Form, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import select
 
 from src.helsa.core.config import settings
-from src.helsa.core.security import create_access_token, hash_password
+from src.helsa.core.security import create_access_token
 from src.helsa.core.types import DBSessionDependency
 from src.helsa.models.security import Token
-from src.helsa.models.user import UserCreate, User
+from src.helsa.models.user import UserCreate
 from src.helsa.routers import constants
-from src.helsa.services.auth_service import authenticate_user
+from src.helsa.services.auth_service import (
+    authenticate_user, issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+)
+from src.helsa.services.user_service import create_user
 
 router = APIRouter(
     prefix="/access",
@@ -25,19 +27,21 @@ router = APIRouter(
     summary=constants.ACCESS_GET_ACCESS_TOKEN_SUMMARY,
     description=constants.ACCESS_GET_ACCESS_TOKEN_DESCRIPTION
 )
-async def get_access_token(
+def get_access_token(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         session: DBSessionDependency
 ) -> Token:
     """
     Login endpoint that provides client with JWT token for authentication
-    assuming correct credentials were provided.
+    assuming correct credentials were provided, and with refresh token for
+    renewing the access token without sending the credentials again.
 
     Response format::
 
         {
             "access_token": "eyJhbGciOiJIUzI1NiI...",
-            "token_type": "bearer"
+            "token_type": "bearer",
+            "refresh_token": "Xq3v9..."
         }
 
     :param form_data: user credentials set as form data: `username` and `password`
@@ -58,16 +62,77 @@ async def get_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    return _create_token(user.username, issue_refresh_token(user.id, session))
+
+
+@router.post(
+    "/refresh-access-token",
+    summary=constants.ACCESS_REFRESH_ACCESS_TOKEN_SUMMARY,
+    description=constants.ACCESS_REFRESH_ACCESS_TOKEN_DESCRIPTION
+)
+def refresh_access_token(refresh_token: Annotated[str, Form()], session: DBSessionDependency) -> Token:
+    """
+    Renew access token with a refresh token, without verifying the password.
+
+    The refresh token is rotated: the used one is revoked and a new one is returned
+    together with the access token in the same format as by `/get-access-token`.
+
+    :param refresh_token: refresh token obtained with the last access token, set as form data
+    :param session: db `Session` instance
+    :raise HttpException (401 Unauthorized): if the refresh token is invalid, expired or revoked
+    :return: standard response format for authentication
+    """
+    rotated = rotate_refresh_token(refresh_token, session)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=constants.ACCESS_EXC_MSG_INVALID_REFRESH_TOKEN,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    username, new_refresh_token = rotated
+    return _create_token(username, new_refresh_token)
+
+
+@router.post(
+    "/revoke-refresh-token",
+    summary=constants.ACCESS_REVOKE_REFRESH_TOKEN_SUMMARY,
+    description=constants.ACCESS_REVOKE_REFRESH_TOKEN_DESCRIPTION
+)
+def revoke_refresh_access_token(refresh_token: Annotated[str, Form()], session: DBSessionDependency):
+    """
+    Revoke the refresh token and all refresh tokens issued by its rotation, e.g. on logout.
+
+    :param refresh_token: refresh token to revoke, set as form data
+    :param session: db `Session` instance
+    :return: `JSONResponse` with success message
+    """
+    revoke_refresh_token(refresh_token, session)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"message": constants.ACCESS_SUCCESS_MSG_REFRESH_TOKEN_REVOKED}
+    )
+
+
+def _create_token(username: str, refresh_token: str) -> Token:
+    """
+    Create response with a new access token for the user and the given refresh token.
+
+    :param username: username of the authenticated user
+    :param refresh_token: refresh token issued to the user
+    :return: standard response format for authentication
+    """
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
 
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": username},
         expires_delta=access_token_expires,
     )
 
-    return Token(access_token=access_token, token_type=constants.ACCESS_TOKEN_TYPE)
+    return Token(access_token=access_token, token_type=constants.ACCESS_TOKEN_TYPE, refresh_token=refresh_token)
 
 
 @router.post(
@@ -84,19 +149,12 @@ def register_user(user_create: UserCreate, session: DBSessionDependency):
     :raise HttpException (400 Bad Request): if username already exists in db
     :return: `JSONResponse` with success message if new user was registered
     """
-    # Check for duplicate email (username)
-    username_check = session.exec(select(User).where(User.username == user_create.username)).first()
-    if username_check:
+    if not create_user(user_create, session):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=constants.ACCESS_EXC_MSG_USERNAME_EXISTS,
         )
 
-    user = User(username=user_create.username, password_hash=hash_password(user_create.password))
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={"message": constants.ACCESS_SUCCESS_MSG_USER_CREATED}
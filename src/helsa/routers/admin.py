@@ -1,13 +1,29 @@
 import logging
+from datetime import date, timedelta
+from typing import Annotated
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
 
-from src.helsa.core.types import DBSessionDependency
-from src.helsa.models.user import UserFlagsRequest
+from src.helsa.core.admission import get_admission_status
+from src.helsa.core.config import settings
+from src.helsa.core.security import get_current_admin_user
+from src.helsa.core.types import DBSessionDependency, DBReadSessionDependency
+from src.helsa.models.admission import AdmissionStatus
+from src.helsa.models.analytics import SearchDailyRollup, SearchStyleDailyRollup, DiagnoseCount, UserUsage
+from src.helsa.models.user import (
+    UserFlagsRequest, UserFlagsBulkResult, UserFlagsFailure, UserCreateBulkResult, UserCreateFailure
+)
+from src.helsa.repositories.analytics_repository import (
+    get_search_daily_rollups, get_search_style_daily_rollups, get_top_diagnoses, get_user_usage
+)
 from src.helsa.repositories.user_repository import get_user, save_user_flags
 from src.helsa.routers import constants
+from src.helsa.services.user_service import (
+    BULK_CONTENT_TYPES, iter_user_flags_entries, apply_user_flags_batch, iter_user_create_entries, create_users_batch
+)
 
 router = APIRouter(
     prefix="/admin",
@@ -42,3 +58,253 @@ def set_user_flags(user_flags_request: UserFlagsRequest, session: DBSessionDepen
     logging.info(success_message)
 
     return JSONResponse(status_code=status.HTTP_200_OK, content={"message": success_message})
+
+
+@router.post("/set-user-flags-bulk",
+             summary=constants.ADMIN_SET_USER_FLAGS_BULK_SUMMARY,
+             description=constants.ADMIN_SET_USER_FLAGS_BULK_DESCRIPTION,
+             dependencies=[Depends(get_current_admin_user)])
+async def set_user_flags_bulk(request: Request, session: DBSessionDependency) -> UserFlagsBulkResult:
+    """
+    This endpoint allows admin to set user flags for many existing users at once.
+
+    The body is parsed as it streams in and valid entries are saved in batches of
+    `ADMIN_BULK_BATCH_SIZE`, each batch in its own transaction.
+
+    Response format::
+
+        {
+            "updated": 2,
+            "failed": [{"line": 3, "username": "unknown@example.com", "error": "User was not found."}]
+        }
+
+    :param request: incoming request with JSON, NDJSON or CSV body
+    :param session: db `Session` instance
+    :raise HttpException (415 Unsupported Media Type): if the body has unsupported content type
+    :raise HttpException (400 Bad Request): if JSON body is not a valid JSON document
+    :return: `UserFlagsBulkResult` with count of updated users and failures per user
+    """
+    content_type = _get_bulk_content_type(request)
+
+    result = UserFlagsBulkResult()
+    batch = []
+    async for line, entry in iter_user_flags_entries(request, content_type):
+        if isinstance(entry, UserFlagsFailure):
+            result.failed.append(entry)
+            continue
+
+        batch.append((line, entry))
+        if len(batch) >= settings.ADMIN_BULK_BATCH_SIZE:
+            await run_in_threadpool(apply_user_flags_batch, batch, session, result)
+            batch = []
+
+    if batch:
+        await run_in_threadpool(apply_user_flags_batch, batch, session, result)
+
+    logging.info(constants.ADMIN_LOG_BULK_FLAGS_SET.format(updated=result.updated, failed=len(result.failed)))
+
+    return result
+
+
+@router.post("/create-users-bulk",
+             summary=constants.ADMIN_CREATE_USERS_BULK_SUMMARY,
+             description=constants.ADMIN_CREATE_USERS_BULK_DESCRIPTION,
+             dependencies=[Depends(get_current_admin_user)])
+async def create_users_bulk(request: Request, session: DBSessionDependency) -> UserCreateBulkResult:
+    """
+    This endpoint allows admin to provision many new users at once, e.g. when onboarding a partner.
+
+    The body is parsed as it streams in. Valid entries are processed in batches of
+    `ADMIN_BULK_BATCH_SIZE`: passwords of a batch are hashed in parallel and the users
+    are inserted with a single statement, skipping usernames which already exist.
+
+    Response format::
+
+        {
+            "created": 2,
+            "failed": [{"line": 3, "username": "taken@example.com", "error": "User with this email already exists."}]
+        }
+
+    :param request: incoming request with JSON, NDJSON or CSV body with `username` and `password` per user
+    :param session: db `Session` instance
+    :raise HttpException (415 Unsupported Media Type): if the body has unsupported content type
+    :raise HttpException (400 Bad Request): if JSON body is not a valid JSON document
+    :return: `UserCreateBulkResult` with count of created users and failures per user
+    """
+    content_type = _get_bulk_content_type(request)
+
+    result = UserCreateBulkResult()
+    seen_usernames = set()
+    batch = []
+    async for line, entry in iter_user_create_entries(request, content_type):
+        if isinstance(entry, UserCreateFailure):
+            result.failed.append(entry)
+            continue
+
+        batch.append((line, entry))
+        if len(batch) >= settings.ADMIN_BULK_BATCH_SIZE:
+            await run_in_threadpool(create_users_batch, batch, session, result, seen_usernames)
+            batch = []
+
+    if batch:
+        await run_in_threadpool(create_users_batch, batch, session, result, seen_usernames)
+
+    logging.info(constants.ADMIN_LOG_BULK_USERS_CREATED.format(created=result.created, failed=len(result.failed)))
+
+    return result
+
+
+def _get_bulk_content_type(request: Request) -> str:
+    """
+    Get media type of bulk request body.
+
+    :param request: incoming request
+    :raise HttpException (415 Unsupported Media Type): if the body has unsupported content type
+    :return: media type, one of `BULK_CONTENT_TYPES`
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in BULK_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=constants.ADMIN_EXC_MSG_UNSUPPORTED_BULK_CONTENT_TYPE.format(
+                content_types=", ".join(BULK_CONTENT_TYPES)
+            )
+        )
+
+    return content_type
+
+
+def _resolve_date_range(date_from: date | None, date_to: date | None) -> tuple[date, date]:
+    """
+    Resolve optional analytics date range, defaulting to the last 30 days.
+
+    :param date_from: first day of the range (optional)
+    :param date_to: last day of the range (optional, default: today)
+    :raise HttpException (400 Bad Request): if `date_from` is later than `date_to`
+    :return: tuple of first and last day of the range
+    """
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=constants.ANALYTICS_EXC_MSG_INVALID_DATE_RANGE
+        )
+
+    return date_from, date_to
+
+
+@router.get("/analytics/searches",
+            summary=constants.ANALYTICS_SEARCHES_SUMMARY,
+            description=constants.ANALYTICS_SEARCHES_DESCRIPTION,
+            dependencies=[Depends(get_current_admin_user)])
+def get_search_analytics(
+        session: DBReadSessionDependency,
+        date_from: date | None = None,
+        date_to: date | None = None
+) -> list[SearchDailyRollup]:
+    """
+    This endpoint allows admin to read daily search counts and image usage per user tier.
+    Rollups are flushed every `USAGE_FLUSH_SECONDS`, so the latest searches may be missing.
+
+    :param session: db `Session` instance
+    :param date_from: first day of the range (default: 30 days before `date_to`)
+    :param date_to: last day of the range (default: today)
+    :return: list of daily rollups ordered by day
+    """
+    date_from, date_to = _resolve_date_range(date_from, date_to)
+    return get_search_daily_rollups(date_from, date_to, session)
+
+
+@router.get("/analytics/styles",
+            summary=constants.ANALYTICS_STYLES_SUMMARY,
+            description=constants.ANALYTICS_STYLES_DESCRIPTION,
+            dependencies=[Depends(get_current_admin_user)])
+def get_style_analytics(
+        session: DBReadSessionDependency,
+        date_from: date | None = None,
+        date_to: date | None = None
+) -> list[SearchStyleDailyRollup]:
+    """
+    This endpoint allows admin to read daily search counts split by response tone and language style.
+    Rollups are flushed every `USAGE_FLUSH_SECONDS`, so the latest searches may be missing.
+
+    :param session: db `Session` instance
+    :param date_from: first day of the range (default: 30 days before `date_to`)
+    :param date_to: last day of the range (default: today)
+    :return: list of daily rollups ordered by day
+    """
+    date_from, date_to = _resolve_date_range(date_from, date_to)
+    return get_search_style_daily_rollups(date_from, date_to, session)
+
+
+@router.get("/analytics/top-diagnoses",
+            summary=constants.ANALYTICS_TOP_DIAGNOSES_SUMMARY,
+            description=constants.ANALYTICS_TOP_DIAGNOSES_DESCRIPTION,
+            dependencies=[Depends(get_current_admin_user)])
+def get_top_diagnoses_analytics(
+        session: DBReadSessionDependency,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        limit: Annotated[int, Query(ge=1, le=100)] = 10
+) -> list[DiagnoseCount]:
+    """
+    This endpoint allows admin to read the most frequent diagnoses over a date range.
+    Rollups are flushed every `USAGE_FLUSH_SECONDS`, so the latest searches may be missing.
+
+    :param session: db `Session` instance
+    :param date_from: first day of the range (default: 30 days before `date_to`)
+    :param date_to: last day of the range (default: today)
+    :param limit: maximum count of returned diagnoses (default: 10)
+    :return: list of diagnoses with their counts, ordered from the most frequent
+    """
+    date_from, date_to = _resolve_date_range(date_from, date_to)
+    return get_top_diagnoses(date_from, date_to, limit, session)
+
+
+@router.get("/analytics/usage",
+            summary=constants.ANALYTICS_USAGE_SUMMARY,
+            description=constants.ANALYTICS_USAGE_DESCRIPTION,
+            dependencies=[Depends(get_current_admin_user)])
+def get_usage_analytics(
+        session: DBReadSessionDependency,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        has_premium_tier: bool | None = None,
+        limit: Annotated[int, Query(ge=1, le=1000)] = 100
+) -> list[UserUsage]:
+    """
+    This endpoint allows admin to read upstream model usage of the heaviest users over a date range,
+    including their busiest day, for setting tier quotas. Rollups are flushed every
+    `USAGE_FLUSH_SECONDS`, so the latest searches may be missing.
+
+    :param session: db `Session` instance
+    :param date_from: first day of the range (default: 30 days before `date_to`)
+    :param date_to: last day of the range (default: today)
+    :param has_premium_tier: count only searches made with or without premium tier (optional)
+    :param limit: maximum count of returned users (default: 100)
+    :return: list of users with their usage, ordered by total tokens from the heaviest user
+    """
+    date_from, date_to = _resolve_date_range(date_from, date_to)
+    return get_user_usage(date_from, date_to, has_premium_tier, limit, session)
+
+
+@router.get("/admission",
+            summary=constants.ADMIN_ADMISSION_STATUS_SUMMARY,
+            description=constants.ADMIN_ADMISSION_STATUS_DESCRIPTION,
+            dependencies=[Depends(get_current_admin_user)])
+async def admission_status() -> list[AdmissionStatus]:
+    """
+    Show current load per admission route class of the worker serving this request to admin.
+    It is never limited by admission control, and only the admin check runs in the threadpool,
+    which has free threads as long as the route classes admit fewer requests than its size (40).
+
+    Response format::
+
+        [
+            {"name": "diagnose", "in_flight": 8, "queued": 3, "max_concurrency": 8, "max_queue": 8, "rejected": 12}
+        ]
+
+    :return: list of `AdmissionStatus`, one per route class
+    """
+    return get_admission_status()
@@ -2,10 +2,18 @@ ACCESS_EXC_MSG_INCORRECT_CREDENTIALS = "Incorrect username or password"
 ACCESS_EXC_MSG_USERNAME_EXISTS = "User with this email already exists"
 ACCESS_SUCCESS_MSG_USER_CREATED = "User was successfully created!"
 ACCESS_TOKEN_TYPE = "bearer"
+ACCESS_EXC_MSG_INVALID_REFRESH_TOKEN = "Invalid, expired or revoked refresh token"
+ACCESS_SUCCESS_MSG_REFRESH_TOKEN_REVOKED = "Refresh token was revoked."
 
 ACCESS_GET_ACCESS_TOKEN_SUMMARY = "Get access token"
 ACCESS_GET_ACCESS_TOKEN_DESCRIPTION = "Obtain access token after authenticating with user credentials"
 
+ACCESS_REFRESH_ACCESS_TOKEN_SUMMARY = "Refresh access token"
+ACCESS_REFRESH_ACCESS_TOKEN_DESCRIPTION = "Obtain new access token and rotated refresh token in exchange for a valid refresh token"
+
+ACCESS_REVOKE_REFRESH_TOKEN_SUMMARY = "Revoke refresh token"
+ACCESS_REVOKE_REFRESH_TOKEN_DESCRIPTION = "Revoke refresh token and all tokens rotated from the same login"
+
 ACCESS_REGISTER_USER_SUMMARY = "Register new user"
 ACCESS_REGISTER_USER_DESCRIPTION = "Upon providing valid `username` and `password`, create and save a distinct new user to db."
 
@@ -15,6 +23,28 @@ ADMIN_EXC_MSG_NO_USER_FLAGS_UNSET = "User was not found. Flags unset."
 ADMIN_SET_USER_FLAGS_SUMMARY = "Set flags for a user"
 ADMIN_SET_USER_FLAGS_DESCRIPTION = "Allow admin to set and save flags for a user found by username"
 
+ADMIN_EXC_MSG_UNSUPPORTED_BULK_CONTENT_TYPE = "Unsupported content type. Use one of: {content_types}."
+ADMIN_LOG_BULK_FLAGS_SET = "Bulk user flags update finished: {updated} updated, {failed} failed"
+
+ADMIN_SET_USER_FLAGS_BULK_SUMMARY = "Set flags for many users"
+ADMIN_SET_USER_FLAGS_BULK_DESCRIPTION = \
+    "Allow admin to set and save flags for many users at once. Accepts a JSON list of user flags requests, " \
+    "or a streamed NDJSON (`application/x-ndjson`) or CSV (`text/csv`) body. Reports failures per user."
+
+ADMIN_LOG_BULK_USERS_CREATED = "Bulk user provisioning finished: {created} created, {failed} failed"
+
+ADMIN_CREATE_USERS_BULK_SUMMARY = "Create many users"
+ADMIN_CREATE_USERS_BULK_DESCRIPTION = \
+    "Allow admin to provision many new users at once. Accepts a JSON list of user credentials, " \
+    "or a streamed NDJSON (`application/x-ndjson`) or CSV (`text/csv`, `username` and `password` columns) body. " \
+    "Existing usernames are reported as failures per user."
+
+ADMIN_ADMISSION_STATUS_SUMMARY = "Show admission control status"
+ADMIN_ADMISSION_STATUS_DESCRIPTION = \
+    "Show in-flight and queued request counts per route class of the worker serving the request"
+
+DIAGNOSE_NEAR_DUPLICATE_ROUTE = "near-duplicate"
+DIAGNOSE_IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
 DIAGNOSE_LOG_REQUEST_NOT_PARSED = "OpenAI API did not parse the response properly."
 DIAGNOSE_EXC_MSG_REQUEST_FAILED = "Requesting diagnose failed, please try again later."
 DIAGNOSE_EXC_MSG_OPENAI_VALIDATION_ERROR = "Invalid output from AI service. Please try again later."
@@ -26,4 +56,36 @@ DIAGNOSE_EXC_MSG_UNEXPECTED_ERROR = "Unexpected error occurred during obtaining
 
 DIAGNOSE_GET_DIAGNOSE_SUMMARY = "Get AI generated diagnostic response"
 DIAGNOSE_GET_DIAGNOSE_DESCRIPTION = \
-    "Obtain an AI generated diagnostic response from OpenAI API based on provided patient data."
\ No newline at end of file
+    "Obtain an AI generated diagnostic response from OpenAI API based on provided patient data."
+
+ANALYTICS_EXC_MSG_INVALID_DATE_RANGE = "Parameter `date_from` must not be later than `date_to`."
+
+ANALYTICS_SEARCHES_SUMMARY = "Get daily search counts"
+ANALYTICS_SEARCHES_DESCRIPTION = \
+    "Allow admin to read daily counts of searches and image usage per user tier from the analytics rollups."
+ANALYTICS_STYLES_SUMMARY = "Get daily response style split"
+ANALYTICS_STYLES_DESCRIPTION = \
+    "Allow admin to read daily counts of searches split by response tone and language style from the analytics rollups."
+ANALYTICS_TOP_DIAGNOSES_SUMMARY = "Get most frequent diagnoses"
+ANALYTICS_TOP_DIAGNOSES_DESCRIPTION = \
+    "Allow admin to read the most frequent diagnoses over a date range from the analytics rollups."
+ANALYTICS_USAGE_SUMMARY = "Get upstream model usage per user"
+ANALYTICS_USAGE_DESCRIPTION = \
+    "Allow admin to read input, output and image tokens and upstream latency of the heaviest users " \
+    "over a date range, optionally for one user tier, from the usage rollups."
+
+
+HISTORY_SEARCH_SUMMARY = "Search in consultation history"
+HISTORY_SEARCH_DESCRIPTION = \
+    "Full-text search over symptoms and diagnoses of current user's past consultations, " \
+    "ordered by relevance and paginated with `next_cursor`."
+
+HISTORY_SIMILAR_SUMMARY = "Find similar previous consultations"
+HISTORY_SIMILAR_DESCRIPTION = \
+    "Find current user's past consultations with symptoms similar to the provided ones. " \
+    "Available only if the similarity index is enabled."
+
+HISTORY_EXPORT_SUMMARY = "Export consultation history"
+HISTORY_EXPORT_DESCRIPTION = \
+    "Stream all past consultations of the current user with diagnoses and image metadata " \
+    "as NDJSON (`ndjson`), CSV (`csv`) or zip archive including image files (`zip`)."
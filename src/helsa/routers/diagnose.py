@@ -1,10 +1,11 @@
 from typing import Annotated
 
-from fastapi import Depends, Form, status, UploadFile, APIRouter
+from fastapi import Depends, Form, Header, status, UploadFile, APIRouter
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from openai import OpenAI, APIError, RateLimitError, BadRequestError, AuthenticationError
 from pydantic import ValidationError
+from sqlmodel import Session
 
 from src.helsa.core.config import settings
 from src.helsa.core.exceptions import exception_response
@@ -14,9 +15,14 @@ from src.helsa.core.types import DBSessionDependency
 from src.helsa.models.consultation import ResponseTone, LanguageStyle, DoctorsResponse, PatientReport, SexAssignedAtBirth
 from src.helsa.models.user import User
 from src.helsa.routers import constants
-from src.helsa.services.image_service import upload_images, encode_images_to_base64, base64_images_to_urls
+from src.helsa.services.idempotency_service import IdempotentRequest, fingerprint_request, idempotent_request
+from src.helsa.services.image_service import (
+    upload_images, encode_images_to_base64, base64_images_to_urls, estimate_image_tokens
+)
 from src.helsa.services.prompt_service import build_diagnose_prompt
+from src.helsa.services.routing_service import select_model_route, parse_diagnose
 from src.helsa.services.search_service import save_search, create_search
+from src.helsa.services.similarity_service import find_near_duplicate_response
 
 router = APIRouter(
     tags=["diagnose"]
@@ -39,12 +45,17 @@ def get_diagnose(
         saab: Annotated[SexAssignedAtBirth | None, Form()] = None,
         symptom_images: Annotated[list[UploadFile] | None, Form()] = [],
         response_tone: Annotated[ResponseTone, Form()] = ResponseTone.PROFESSIONAL,
-        language_style: Annotated[LanguageStyle, Form()] = LanguageStyle.SIMPLE
+        language_style: Annotated[LanguageStyle, Form()] = LanguageStyle.SIMPLE,
+        idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key", max_length=255)] = None
 ):
     """
     This endpoint serves to obtain an AI generated diagnostic response
     from OpenAI API based on provided patient data.
 
+    Requests with the same `Idempotency-Key` header from the same user are processed once
+    within `IDEMPOTENCY_KEY_EXPIRE_SECONDS`: a retry of a completed request gets its response
+    replayed, marked by the `Idempotent-Replayed` header, a retry of a request in flight waits for its response.
+
     :param current_user: current `User` instance
     :param session: db `Session` instance
     :param symptoms: description of patient's symptoms
@@ -54,14 +65,72 @@ def get_diagnose(
     :param symptom_images: images of visible symptoms on the body (optional)
     :param response_tone: requested tone of the response (default: `professional`)
     :param language_style: requested language style (default: `simple`)
+    :param idempotency_key: key identifying retries of the same request (optional)
+    :raise HttpException (422 Unprocessable Entity): if the idempotency key was used for a different request
+    :raise HttpException (409 Conflict): if the request with the same idempotency key is still in flight
+        after `IDEMPOTENCY_IN_FLIGHT_SECONDS`
     :raise HttpException: if following exception raises during contacting OpenAI API:
     `ValidationError` `APIError`, `RateLimitError`, `BadRequestError`, `AuthenticationError`, `Exception`
     :return: `JSONResponse` with content set to parsed AI response json if successfully obtained
     """
+    fingerprint = fingerprint_request(
+        {
+            "symptoms": symptoms,
+            "duration": duration,
+            "age_years": age_years,
+            "saab": saab,
+            "response_tone": response_tone,
+            "language_style": language_style
+        },
+        symptom_images
+    ) if idempotency_key else None
+
+    with idempotent_request(current_user, idempotency_key, fingerprint, session) as idempotent:
+        if idempotent.response:
+            return JSONResponse(
+                status_code=status.HTTP_200_OK,
+                content=jsonable_encoder(idempotent.response),
+                headers={constants.DIAGNOSE_IDEMPOTENT_REPLAYED_HEADER: "true"}
+            )
+
+        return _get_diagnose(
+            current_user, session, idempotent, symptoms, duration, age_years, saab, symptom_images,
+            response_tone, language_style
+        )
+
+
+def _get_diagnose(
+        current_user: User,
+        session: Session,
+        idempotent: IdempotentRequest,
+        symptoms: str,
+        duration: str | None,
+        age_years: int | None,
+        saab: SexAssignedAtBirth | None,
+        symptom_images: list[UploadFile],
+        response_tone: ResponseTone,
+        language_style: LanguageStyle
+):
+    """
+    Obtain the diagnostic response, save it as a search and complete the idempotent request.
+
+    :param current_user: current `User` instance
+    :param session: db `Session` instance
+    :param idempotent: claimed `IdempotentRequest` to complete with the saved search
+    :param symptoms: description of patient's symptoms
+    :param duration: duration of the symptoms (optional)
+    :param age_years: patient's age in years (optional)
+    :param saab: patient's sex assigned at birth (optional)
+    :param symptom_images: images of visible symptoms on the body
+    :param response_tone: requested tone of the response
+    :param language_style: requested language style
+    :raise HttpException: if contacting OpenAI API fails, see `get_diagnose`
+    :return: `JSONResponse` with content set to parsed AI response json
+    """
     images = upload_images(current_user, symptom_images)
     image_paths = [image.filename for image in images]
     base64_images = encode_images_to_base64(image_paths)
-    image_urls = base64_images_to_urls(base64_images)
+    image_urls = base64_images_to_urls(base64_images, image_paths)
 
     try:
         patient_report = PatientReport(
@@ -73,35 +142,28 @@ def get_diagnose(
             saab=saab
         )
 
-        prompt = build_diagnose_prompt(patient_report)
-        response = client.responses.parse(
-            model="gpt-4.1",
-            input=[
-                {"role": "system", "content": prompt.system_instruction},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": prompt.query},
-                        *[{"type": "input_image", "image_url": url, "detail": "high"} for url in image_urls]
-                    ]
-                }
-            ],
-            temperature=prompt.temperature,
-            text_format=DoctorsResponse,
-            user=str(current_user.id)
-        )
-
-        parsed_response = response.output[0].content[0].parsed
+        # reports with images are never near-duplicates, images are not part of the similarity index
+        parsed_response = None if images else find_near_duplicate_response(current_user, patient_report, session)
+        model_route, usage = constants.DIAGNOSE_NEAR_DUPLICATE_ROUTE, None
         if not parsed_response:
-            logger.error(constants.DIAGNOSE_LOG_REQUEST_NOT_PARSED)
-            raise exception_response(message=constants.DIAGNOSE_EXC_MSG_REQUEST_FAILED)
+            prompt = build_diagnose_prompt(patient_report)
+            route = select_model_route(patient_report.symptoms, bool(image_urls), current_user)
+            parsed_response, usage = parse_diagnose(client, route, prompt, image_urls, current_user)
+            usage.image_tokens = sum(estimate_image_tokens(*image.size, route.image_detail) for image in images)
+            model_route = route.name
+            if not parsed_response:
+                logger.error(constants.DIAGNOSE_LOG_REQUEST_NOT_PARSED)
+                raise exception_response(message=constants.DIAGNOSE_EXC_MSG_REQUEST_FAILED)
 
         search = create_search(
             report=patient_report,
             user=current_user,
             response=parsed_response,
-            images=images
+            images=images,
+            model_route=model_route,
+            usage=usage
         )
+        idempotent.complete(search.id, session)
         save_search(search, session)
 
         return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder(parsed_response))
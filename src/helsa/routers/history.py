@@ -0,0 +1,117 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from src.helsa.core.security import get_current_user
+from src.helsa.core.replicas import get_read_engine
+from src.helsa.core.types import DBUserReadSessionDependency
+from src.helsa.models.consultation import PatientReport, ResponseTone, LanguageStyle
+from src.helsa.models.search import SearchHistoryPage, SimilarSearch, ExportFormat
+from src.helsa.models.user import User
+from src.helsa.routers import constants
+from src.helsa.services.export_service import export_ndjson, export_csv, export_zip
+from src.helsa.services.history_service import search_history
+from src.helsa.services.similarity_service import find_similar_searches
+
+router = APIRouter(
+    prefix="/history",
+    tags=["history"]
+)
+
+
+@router.get(
+    "/search",
+    summary=constants.HISTORY_SEARCH_SUMMARY,
+    description=constants.HISTORY_SEARCH_DESCRIPTION
+)
+def search_consultation_history(
+        current_user: Annotated[User, Depends(get_current_user)],
+        session: DBUserReadSessionDependency,
+        q: Annotated[str, Query(min_length=2, max_length=200)],
+        limit: Annotated[int, Query(ge=1, le=100)] = 20,
+        cursor: str | None = None
+) -> SearchHistoryPage:
+    """
+    This endpoint serves to find past consultations of the current user by words
+    from symptoms or diagnoses, e.g. `rash`, `"sore throat" -fever`.
+
+    :param current_user: current `User` instance
+    :param session: db `Session` instance
+    :param q: full-text query in web search syntax
+    :param limit: page size (default: 20)
+    :param cursor: `next_cursor` value from the previous page (optional)
+    :raise HttpException (400 Bad Request): if the cursor is malformed
+    :return: page of matching consultations ordered by relevance
+    """
+    return search_history(current_user, q, limit, cursor, session)
+
+
+@router.get(
+    "/similar",
+    summary=constants.HISTORY_SIMILAR_SUMMARY,
+    description=constants.HISTORY_SIMILAR_DESCRIPTION
+)
+def get_similar_consultations(
+        current_user: Annotated[User, Depends(get_current_user)],
+        session: DBUserReadSessionDependency,
+        symptoms: Annotated[str, Query(min_length=5, max_length=500)],
+        age_years: Annotated[int | None, Query(ge=0)] = None,
+        response_tone: ResponseTone = ResponseTone.PROFESSIONAL,
+        language_style: LanguageStyle = LanguageStyle.SIMPLE,
+        limit: Annotated[int, Query(ge=1, le=20)] = 5
+) -> list[SimilarSearch]:
+    """
+    This endpoint serves to find past consultations of the current user similar
+    to the provided symptoms, even if they are worded differently.
+
+    :param current_user: current `User` instance
+    :param session: db `Session` instance
+    :param symptoms: description of patient's symptoms
+    :param age_years: patient's age in years (optional)
+    :param response_tone: tone of the response (default: `professional`)
+    :param language_style: language style (default: `simple`)
+    :param limit: maximum count of returned consultations (default: 5)
+    :raise HttpException (503 Service Unavailable): if the similarity index is disabled or not built yet
+    :return: list of similar consultations, most similar first
+    """
+    report = PatientReport(
+        symptoms=symptoms,
+        duration=None,
+        age_years=age_years,
+        response_tone=response_tone,
+        language_style=language_style
+    )
+    return find_similar_searches(current_user, report, limit, session)
+
+
+@router.get(
+    "/export",
+    summary=constants.HISTORY_EXPORT_SUMMARY,
+    description=constants.HISTORY_EXPORT_DESCRIPTION
+)
+def export_consultation_history(
+        current_user: Annotated[User, Depends(get_current_user)],
+        export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON
+) -> StreamingResponse:
+    """
+    This endpoint serves to export the full consultation history of the current user,
+    e.g. for data portability requests. The export is streamed while read from the db.
+
+    :param current_user: current `User` instance
+    :param export_format: format of the export (default: `ndjson`)
+    :return: `StreamingResponse` with the export as an attachment
+    """
+    exporters = {
+        ExportFormat.NDJSON: (export_ndjson, "application/x-ndjson"),
+        ExportFormat.CSV: (export_csv, "text/csv"),
+        ExportFormat.ZIP: (export_zip, "application/zip"),
+    }
+    exporter, media_type = exporters[export_format]
+    filename = f"helsa-history.{export_format.value}"
+
+    return StreamingResponse(
+        exporter(current_user.id, get_read_engine(current_user.username)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
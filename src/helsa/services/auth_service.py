@@ -1,8 +1,19 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+
 from sqlmodel import Session
 
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
 from src.helsa.core.security import verify_password
 from src.helsa.models.user import User
+from src.helsa.repositories.token_repository import (
+    save_refresh_token, revoke_valid_refresh_token, revoke_refresh_token_family
+)
 from src.helsa.repositories.user_repository import get_user
+from src.helsa.services import constants
 
 
 def authenticate_user(username: str, password: str, session: Session) -> bool | User:
@@ -22,3 +33,71 @@ def authenticate_user(username: str, password: str, session: Session) -> bool |
         return False
 
     return user
+
+
+def _hash_refresh_token(refresh_token: str) -> bytes:
+    """
+    Hash refresh token for storing and lookup. Tokens are random, so a fast hash is sufficient.
+
+    :param refresh_token: refresh token as issued to the client
+    :return: SHA-256 digest of the token
+    """
+    return hashlib.sha256(refresh_token.encode("utf-8")).digest()
+
+
+def issue_refresh_token(user_id: uuid.UUID, session: Session, family_id: uuid.UUID | None = None) -> str:
+    """
+    Issue a new refresh token for the user and save its hash to the db.
+
+    :param user_id: id of the token owner
+    :param session: db `Session` instance
+    :param family_id: family of the rotated token (optional, new family for a new login)
+    :return: refresh token to hand to the client
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    save_refresh_token(
+        token_hash=_hash_refresh_token(refresh_token),
+        family_id=family_id or uuid.uuid4(),
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        session=session
+    )
+    session.commit()
+
+    return refresh_token
+
+
+def rotate_refresh_token(refresh_token: str, session: Session) -> tuple[str, str] | None:
+    """
+    Exchange a valid refresh token for a new one, without any password verification.
+
+    The used token is revoked. If it was already revoked before, the token was likely stolen
+    and all tokens of its family are revoked, logging out both the thief and the user.
+    An expired token is only rejected, it is the usual end of a session which was not renewed in time.
+
+    :param refresh_token: refresh token sent by the client
+    :param session: db `Session` instance
+    :return: tuple of owner's username and a new refresh token, or None if the token is not valid
+    """
+    token_hash = _hash_refresh_token(refresh_token)
+    revoked = revoke_valid_refresh_token(token_hash, session)
+    if not revoked:
+        revoked_count = revoke_refresh_token_family(token_hash, session, reused_only=True)
+        session.commit()
+        if revoked_count:
+            logger.warning(constants.AUTH_SERVICE_LOG_REFRESH_TOKEN_REUSED.format(count=revoked_count))
+        return None
+
+    username, user_id, family_id = revoked
+    return username, issue_refresh_token(user_id, session, family_id)
+
+
+def revoke_refresh_token(refresh_token: str, session: Session):
+    """
+    Revoke the refresh token and all other tokens of its family, e.g. on logout.
+
+    :param refresh_token: refresh token sent by the client
+    :param session: db `Session` instance
+    """
+    revoke_refresh_token_family(_hash_refresh_token(refresh_token), session)
+    session.commit()
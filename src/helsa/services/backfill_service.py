@@ -0,0 +1,40 @@
+import time
+
+from sqlmodel import Session
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.repositories.analytics_repository import backfill_search_rollups
+from src.helsa.repositories.search_repository import backfill_search_vectors_batch
+from src.helsa.services import constants
+
+
+def backfill_search_vectors(session: Session) -> int:
+    """
+    Build missing full-text documents of searches in batches of `BACKFILL_BATCH_SIZE`, each in its own
+    short transaction followed by a pause of `RETENTION_BATCH_PAUSE_SECONDS`.
+
+    :param session: db `Session` instance
+    :return: count of updated searches
+    """
+    updated = 0
+    while True:
+        batch_updated = backfill_search_vectors_batch(settings.BACKFILL_BATCH_SIZE, session)
+        updated += batch_updated
+        if batch_updated < settings.BACKFILL_BATCH_SIZE:
+            return updated
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+
+def run_backfill():
+    """
+    Backfill data of searches saved before full-text search and analytics rollups were introduced.
+    Safe to run again, already backfilled data is left as it is.
+    """
+    with Session(engine) as session:
+        searches = backfill_search_vectors(session)
+        rollups = backfill_search_rollups(session)
+        session.commit()
+
+    logger.info(constants.BACKFILL_SERVICE_LOG_FINISHED.format(searches=searches, rollups=rollups))
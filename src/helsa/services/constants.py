@@ -2,4 +2,49 @@ IMAGE_SERVICE_EXC_MSG_NO_PREMIUM_TIER = "For uploading images you need to have a
 IMAGE_SERVICE_EXC_MSG_IMAGE_COUNT_EXCEEDED = "Too many images. Maximum allowed count is {}."
 IMAGE_SERVICE_EXC_MSG_SAVING_IO_ERROR = "Error occurred when saving images. Please try again later."
 IMAGE_SERVICE_EXC_MSG_UNSUPPORTED_IMAGE_FORMAT = "This format is not supported for an image input."
-IMAGE_SERVICE_EXC_MSG_IMAGE_TOO_LARGE = "Uploaded image was too large. The request was denied."
\ No newline at end of file
+IMAGE_SERVICE_EXC_MSG_IMAGE_TOO_LARGE = "Uploaded image was too large. The request was denied."
+USER_SERVICE_EXC_MSG_USER_NOT_FOUND = "User was not found."
+USER_SERVICE_EXC_MSG_NO_FLAGS = "No flags were provided."
+USER_SERVICE_EXC_MSG_INVALID_JSON = "Entry is not valid JSON."
+USER_SERVICE_EXC_MSG_INVALID_JSON_BODY = "Request body is not a valid JSON document."
+USER_SERVICE_EXC_MSG_INVALID_UTF8 = "Entry is not valid UTF-8 text."
+USER_SERVICE_EXC_MSG_BATCH_FAILED = "Saving the batch failed, flags unset."
+USER_SERVICE_EXC_MSG_CSV_MISSING_USERNAME = "CSV header must contain the `username` column."
+USER_SERVICE_EXC_MSG_USERNAME_EXISTS = "User with this email already exists."
+USER_SERVICE_EXC_MSG_CREATE_BATCH_FAILED = "Saving the batch failed, users not created."
+
+SEARCH_SERVICE_LOG_AFTER_SAVE_FAILED = "Updating caches and usage after saving search {search_id} failed"
+
+HISTORY_SERVICE_EXC_MSG_INVALID_CURSOR = "Invalid pagination cursor."
+
+SIMILARITY_SERVICE_LOG_INDEX_BUILT = "Similarity index built with {count} searches in {seconds:.1f} s."
+SIMILARITY_SERVICE_LOG_INDEX_BUILD_FAILED = "Building similarity index failed"
+SIMILARITY_SERVICE_LOG_INDEX_REFRESH_FAILED = "Refreshing similarity index failed"
+SIMILARITY_SERVICE_LOG_NEAR_DUPLICATE = "Reusing diagnoses of near-duplicate search {search_id} (similarity {similarity:.3f})."
+SIMILARITY_SERVICE_EXC_MSG_NOT_AVAILABLE = "Similarity search is not available right now. Please try again later."
+
+RETENTION_SERVICE_LOG_PURGE_FINISHED = "Retention purge finished: {searches} searches deleted, {files} files removed."
+RETENTION_SERVICE_LOG_PURGE_SKIPPED = "Retention purge is already running elsewhere, skipped."
+RETENTION_SERVICE_LOG_PURGE_FAILED = "Retention purge failed"
+RETENTION_SERVICE_LOG_FILE_REMOVAL_FAILED = "Removing purged image file failed"
+
+BACKFILL_SERVICE_LOG_FINISHED = "Backfill finished: {searches} search documents built, {rollups} rollup rows upserted."
+
+ROUTING_SERVICE_LOG_FALLBACK = "Model {model} of route {route} failed ({error}), falling back to {fallback_model}."
+
+AUTH_SERVICE_LOG_REFRESH_TOKEN_REUSED = "Revoked refresh token was reused, revoked {count} tokens of its family."
+
+IDEMPOTENCY_SERVICE_LOG_REPLAYED = "Replaying result of search {search_id} for a repeated idempotency key."
+IDEMPOTENCY_SERVICE_EXC_MSG_KEY_REUSED = "Idempotency key was already used for a different request."
+IDEMPOTENCY_SERVICE_EXC_MSG_IN_FLIGHT = "Request with this idempotency key is still being processed. Please retry later."
+
+PARTITION_SERVICE_LOG_NOT_PARTITIONED = "Table `search` is not partitioned, creating and dropping partitions skipped."
+PARTITION_SERVICE_LOG_PARTITIONS_CREATED = "Created search partitions for {count} months."
+PARTITION_SERVICE_LOG_PARTITION_DROPPED = "Dropped expired search partitions of {month}."
+PARTITION_SERVICE_LOG_DROP_LOCK_TIMEOUT = (
+    "Dropping search partitions of {month} timed out waiting for a lock, retrying in {seconds} s."
+)
+PARTITION_SERVICE_LOG_MAINTENANCE_FAILED = "Search partition maintenance failed"
+
+USAGE_SERVICE_LOG_FLUSH_FAILED = "Flushing usage rollups failed, kept buffered"
+USAGE_SERVICE_LOG_SHUTDOWN_FLUSH_FAILED = "Flushing usage rollups on shutdown failed"
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import os
+import uuid
+import zipfile
+from typing import Iterator
+
+from sqlalchemy import Engine, RowMapping
+
+from src.helsa.core.config import settings
+from src.helsa.database import engine
+from src.helsa.repositories.search_repository import stream_user_searches
+
+EXPORT_CSV_COLUMNS = [
+    "search_id", "created_at", "symptoms", "patient_age_years", "response_tone", "language_style",
+    "image_count", "diagnose_name", "diagnose_description", "diagnose_recommended_action"
+]
+_FILE_CHUNK_BYTES = 1024 * 1024
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """ Write-only, unseekable buffer collecting written bytes until they are taken out with `pop`. """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _export_record(row: RowMapping) -> dict:
+    """
+    Convert streamed search row into JSON serializable export record.
+
+    Image paths on the server are replaced by file names used in the export archive.
+
+    :param row: row returned by `stream_user_searches`
+    :return: dict with search data, nested diagnoses and image metadata
+    """
+    return {
+        "id": str(row["id"]),
+        "created_at": row["created_at"].isoformat(),
+        "symptoms": row["symptoms"],
+        "patient_age_years": row["patient_age_years"],
+        "response_tone": row["response_tone"].value,
+        "language_style": row["language_style"].value,
+        "diagnoses": row["diagnoses"],
+        "images": [
+            {"file": os.path.basename(image["image_src"]), "width": image["width"], "height": image["height"]}
+            for image in row["images"]
+        ]
+    }
+
+
+def _stream_rows(user_id: uuid.UUID, read_engine: Engine) -> Iterator[RowMapping]:
+    """
+    Stream user's searches over a dedicated connection, open only while the export is being sent.
+
+    :param user_id: id of the user owning the searches
+    :param read_engine: engine to read from, primary or replica
+    :return: iterator of streamed rows
+    """
+    with read_engine.connect() as connection:
+        yield from stream_user_searches(user_id, settings.EXPORT_FETCH_SIZE, connection)
+
+
+def export_ndjson(user_id: uuid.UUID, read_engine: Engine = engine) -> Iterator[bytes]:
+    """
+    Export user's consultation history as NDJSON, one search with nested data per line.
+
+    :param user_id: id of the user owning the searches
+    :param read_engine: engine to read from, primary or replica (default: primary)
+    :return: iterator of encoded lines
+    """
+    for row in _stream_rows(user_id, read_engine):
+        yield (json.dumps(_export_record(row), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def export_csv(user_id: uuid.UUID, read_engine: Engine = engine) -> Iterator[bytes]:
+    """
+    Export user's consultation history as CSV, one row per diagnose with data of its search repeated.
+
+    :param user_id: id of the user owning the searches
+    :param read_engine: engine to read from, primary or replica (default: primary)
+    :return: iterator of encoded rows, starting with header
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+
+    for row in _stream_rows(user_id, read_engine):
+        record = _export_record(row)
+        search_columns = [
+            record["id"], record["created_at"], record["symptoms"], record["patient_age_years"],
+            record["response_tone"], record["language_style"], len(record["images"])
+        ]
+        for diagnose in record["diagnoses"] or [{}]:
+            writer.writerow(search_columns + [
+                diagnose.get("name"), diagnose.get("description"), diagnose.get("recommended_action")
+            ])
+
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_zip(user_id: uuid.UUID, read_engine: Engine = engine) -> Iterator[bytes]:
+    """
+    Export user's consultation history as a zip archive with `history.ndjson` and image files
+    in the `images` directory. The archive is produced while it is being sent.
+
+    :param user_id: id of the user owning the searches
+    :param read_engine: engine to read from, primary or replica (default: primary)
+    :return: iterator of archive chunks
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("history.ndjson", mode="w") as history_file:
+            for row in _stream_rows(user_id, read_engine):
+                history_file.write((json.dumps(_export_record(row), ensure_ascii=False) + "\n").encode("utf-8"))
+                yield buffer.pop()
+
+        # second pass over the history, so image paths are not collected in memory
+        for row in _stream_rows(user_id, read_engine):
+            for image in row["images"]:
+                if not os.path.isfile(image["image_src"]):
+                    continue
+                # images are already compressed
+                info = zipfile.ZipInfo(f"images/{os.path.basename(image['image_src'])}")
+                info.compress_type = zipfile.ZIP_STORED
+                with open(image["image_src"], "rb") as image_file, archive.open(info, mode="w") as archive_file:
+                    while chunk := image_file.read(_FILE_CHUNK_BYTES):
+                        archive_file.write(chunk)
+                        yield buffer.pop()
+                yield buffer.pop()
+
+    yield buffer.pop()
@@ -0,0 +1,80 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlmodel import Session
+
+from src.helsa.models.search import SearchHistoryHit, SearchHistoryPage
+from src.helsa.models.user import User
+from src.helsa.repositories.search_repository import HistoryCursor, search_user_history
+from src.helsa.services import constants
+
+
+def _encode_cursor(cursor: HistoryCursor) -> str:
+    """
+    Encode keyset cursor to an opaque url-safe string.
+
+    :param cursor: rank, creation time and id of the last returned search
+    :return: url-safe base64 encoded cursor
+    """
+    rank, created_at, search_id = cursor
+    payload = json.dumps([rank, created_at.isoformat(), str(search_id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> HistoryCursor:
+    """
+    Decode cursor created by `_encode_cursor`.
+
+    :param cursor: url-safe base64 encoded cursor
+    :raise HTTPException (400 Bad Request): if the cursor is malformed
+    :return: rank, creation time and id of the last returned search
+    """
+    try:
+        rank, created_at, search_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(rank), datetime.fromisoformat(created_at), uuid.UUID(search_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=constants.HISTORY_SERVICE_EXC_MSG_INVALID_CURSOR
+        )
+
+
+def search_history(user: User, text: str, limit: int, cursor: str | None, session: Session) -> SearchHistoryPage:
+    """
+    Find past searches of the user matching the full-text query.
+
+    :param user: `User` instance - owner of searches
+    :param text: full-text query
+    :param limit: page size
+    :param cursor: cursor returned with the previous page (optional)
+    :param session: db `Session` instance
+    :return: `SearchHistoryPage` with ranked hits and cursor of the next page, if there is one
+    """
+    rows = search_user_history(
+        user_id=user.id,
+        text=text,
+        limit=limit + 1,
+        cursor=_decode_cursor(cursor) if cursor else None,
+        session=session
+    )
+
+    items = [
+        SearchHistoryHit(
+            id=search.id,
+            symptoms=search.symptoms,
+            diagnoses=[diagnose.name for diagnose in search.diagnoses],
+            created_at=search.created_at,
+            rank=rank
+        )
+        for search, rank in rows[:limit]
+    ]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_search, last_rank = rows[limit - 1]
+        next_cursor = _encode_cursor((last_rank, last_search.created_at, last_search.id))
+
+    return SearchHistoryPage(items=items, next_cursor=next_cursor)
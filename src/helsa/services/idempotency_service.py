@@ -0,0 +1,177 @@
+import hashlib
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import UploadFile, status
+from sqlmodel import Session
+
+from src.helsa.core.config import settings
+from src.helsa.core.exceptions import exception_response
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.models.consultation import DoctorsResponse, Diagnose
+from src.helsa.models.user import User
+from src.helsa.repositories.idempotency_repository import (
+    claim_idempotency_key, reclaim_idempotency_key, get_idempotency_key, complete_idempotency_key,
+    release_idempotency_key
+)
+from src.helsa.repositories.search_repository import get_searches_with_diagnoses
+from src.helsa.services import constants
+
+
+class IdempotentRequest:
+    """
+    Request claimed with an `Idempotency-Key`, or replayed result of an earlier request with the same key.
+
+    Without a key, the request is processed as usual and nothing is stored.
+    """
+
+    def __init__(self, user_id: uuid.UUID | None = None, key: str | None = None,
+                 response: DoctorsResponse | None = None):
+        self.user_id = user_id
+        self.key = key
+        self.response = response
+
+    def complete(self, search_id: uuid.UUID, session: Session):
+        """
+        Complete the claimed request with its search, for replays within `IDEMPOTENCY_KEY_EXPIRE_SECONDS`.
+        Must be called before the search is committed, the key is completed in the same transaction.
+
+        :param search_id: id of the search holding the response
+        :param session: db `Session` instance the search is saved with
+        """
+        if self.key is None:
+            return
+
+        complete_idempotency_key(self.user_id, self.key, search_id, session)
+
+
+def fingerprint_request(fields: dict, files: list[UploadFile]) -> str:
+    """
+    Hash request form fields and uploaded file contents, to detect a key reused for a different request.
+
+    :param fields: form fields of the request
+    :param files: uploaded files of the request, left rewound for further reading
+    :return: hex digest of the request
+    """
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8"))
+    for file in files:
+        digest.update(hashlib.sha256(file.file.read()).digest())
+        file.file.seek(0)
+
+    return digest.hexdigest()
+
+
+def _load_response(search_id: uuid.UUID, session: Session) -> DoctorsResponse | None:
+    """
+    Load response of a completed request from its saved search.
+
+    :param search_id: id of the saved search
+    :param session: db `Session` instance
+    :return: `DoctorsResponse` with diagnoses of the search, or None if the search no longer exists
+    """
+    searches = get_searches_with_diagnoses([search_id], session)
+    if not searches:
+        return None
+
+    return DoctorsResponse(diagnoses=[
+        Diagnose(name=diagnose.name, description=diagnose.description, recommended_action=diagnose.recommended_action)
+        for diagnose in searches[0].diagnoses
+    ])
+
+
+def _claim(user: User, idempotency_key: str, fingerprint: str, session: Session) -> IdempotentRequest:
+    """
+    Claim the key for processing, or reuse the result of the completed request holding it.
+
+    The key is claimed by inserting its row in a short transaction of its own, so only one request
+    with the key is processed across all workers. A retry of a request still in flight, e.g. by a client
+    which timed out, polls the key every `IDEMPOTENCY_POLL_SECONDS` until the request completes and
+    its result is reused. A claim not completed within `IDEMPOTENCY_IN_FLIGHT_SECONDS`, e.g. of a crashed
+    worker, is taken over.
+
+    :param user: user making the request
+    :param idempotency_key: value of the `Idempotency-Key` header
+    :param fingerprint: fingerprint of the request
+    :param session: db `Session` instance
+    :raise HttpException (422 Unprocessable Entity): if the key was used for a different request
+    :raise HttpException (409 Conflict): if the request with the key is still being processed
+        after waiting for `IDEMPOTENCY_IN_FLIGHT_SECONDS`
+    :return: `IdempotentRequest` either claimed for processing or with the replayed response
+    """
+    wait_deadline = time.monotonic() + settings.IDEMPOTENCY_IN_FLIGHT_SECONDS
+    while True:
+        with Session(engine) as claim_session:
+            claimed = claim_idempotency_key(
+                user.id, idempotency_key, fingerprint, settings.IDEMPOTENCY_IN_FLIGHT_SECONDS,
+                settings.IDEMPOTENCY_KEY_EXPIRE_SECONDS, claim_session
+            )
+            if claimed:
+                claim_session.commit()
+                return IdempotentRequest(user.id, idempotency_key)
+            entry = get_idempotency_key(user.id, idempotency_key, claim_session)
+        if entry is None:
+            # released or expired meanwhile, claim again
+            continue
+
+        if entry.fingerprint != fingerprint:
+            raise exception_response(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                     message=constants.IDEMPOTENCY_SERVICE_EXC_MSG_KEY_REUSED)
+        if entry.search_id is None:
+            if time.monotonic() >= wait_deadline:
+                raise exception_response(status_code=status.HTTP_409_CONFLICT,
+                                         message=constants.IDEMPOTENCY_SERVICE_EXC_MSG_IN_FLIGHT)
+            time.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+            continue
+
+        response = _load_response(entry.search_id, session)
+        if response:
+            logger.info(constants.IDEMPOTENCY_SERVICE_LOG_REPLAYED.format(search_id=entry.search_id))
+            return IdempotentRequest(response=response)
+
+        # search was purged meanwhile, process the request again
+        with Session(engine) as claim_session:
+            claimed = reclaim_idempotency_key(
+                user.id, idempotency_key, fingerprint, entry.search_id, settings.IDEMPOTENCY_IN_FLIGHT_SECONDS,
+                claim_session
+            )
+            claim_session.commit()
+        if claimed:
+            return IdempotentRequest(user.id, idempotency_key)
+
+
+@contextmanager
+def idempotent_request(
+        user: User,
+        idempotency_key: str | None,
+        fingerprint: str | None,
+        session: Session
+) -> Iterator[IdempotentRequest]:
+    """
+    Process request at most once per user and `Idempotency-Key`, across all workers.
+
+    If the request with the same key is in flight, it is waited for. If it is completed, its response
+    is set on the yielded `IdempotentRequest` to be returned instead of processing the request again.
+    If the search of the claimed request is not committed, e.g. it failed, the key is released for retries.
+
+    :param user: user making the request
+    :param idempotency_key: value of the `Idempotency-Key` header (optional)
+    :param fingerprint: fingerprint of the request, see `fingerprint_request` (optional)
+    :param session: db `Session` instance
+    :return: iterator yielding `IdempotentRequest`
+    """
+    if not idempotency_key:
+        yield IdempotentRequest()
+        return
+
+    request = _claim(user, idempotency_key, fingerprint, session)
+    try:
+        yield request
+    finally:
+        if request.response is None:
+            # completed keys are kept, see `release_idempotency_key`
+            with Session(engine) as release_session:
+                release_idempotency_key(request.user_id, request.key, release_session)
@@ -0,0 +1,38 @@
+from PIL import Image
+
+from src.helsa.models.image import StoragePreset, StoragePresetName
+
+# AVIF is left out on purpose: stored files are sent to the AI service, which does not accept AVIF input
+STORAGE_PRESETS: dict[str, StoragePreset] = {
+    # original format with multi-pass optimization, slowest for PNG
+    "original": StoragePreset(format=None, options={"optimize": True}),
+    # single-pass JPEG, lowest encode time
+    "fast": StoragePreset(format="JPEG", options={"quality": 85}),
+    "balanced": StoragePreset(format="WEBP", options={"quality": 80, "method": 4}),
+    # smallest files, slowest WEBP encoder method
+    "compact": StoragePreset(format="WEBP", options={"quality": 70, "method": 6}),
+}
+
+
+def storage_format(preset_name: StoragePresetName, original_format: str) -> str:
+    """
+    Get format in which an image is stored with the given preset.
+
+    :param preset_name: name of the storage preset
+    :param original_format: format of the uploaded image
+    :return: Pillow format name, e.g. `WEBP`
+    """
+    return STORAGE_PRESETS[preset_name].format or original_format
+
+
+def save_image(image: Image.Image, fp, preset_name: StoragePresetName, original_format: str):
+    """
+    Encode and save image with the given storage preset.
+
+    :param image: image to save
+    :param fp: file path or file object
+    :param preset_name: name of the storage preset
+    :param original_format: format of the uploaded image
+    """
+    preset = STORAGE_PRESETS[preset_name]
+    image.save(fp=fp, format=storage_format(preset_name, original_format), **preset.options)
@@ -1,4 +1,6 @@
 import base64
+import math
+import mimetypes
 import os
 import uuid
 from datetime import datetime
@@ -12,6 +14,11 @@ from src.helsa.core.exceptions import exception_response
 from src.helsa.core.logging import logger
 from src.helsa.models.user import User
 from src.helsa.services import constants
+from src.helsa.services.image_encoding import save_image, storage_format
+
+# input tokens of an image for tile based models (GPT-4o, GPT-4.1): base tokens plus tokens per 512 px tile
+_IMAGE_BASE_TOKENS = 85
+_IMAGE_TILE_TOKENS = 170
 
 
 def _get_exif_orientation_key() -> int | None:
@@ -94,7 +101,8 @@ def upload_images(user: User, symptom_images: list[UploadFile]):
     Process the user uploaded images and save them as static files.
 
     If images are meeting the upload criteria, they are saved to static directory
-    on the server and the list `Image` instances is returned for further processing.
+    on the server, encoded with `IMAGE_STORAGE_PRESET`, and the list `Image` instances
+    is returned for further processing.
     :param user: `User` instance - owner of images
     :param symptom_images: list of files to upload
     :return: list of `Image` instances
@@ -119,8 +127,8 @@ def upload_images(user: User, symptom_images: list[UploadFile]):
             # create and save new image - based on original, without exif data
             image_sans_exif = Image.new(mode, size)
             image_sans_exif.putdata(image_data)
-            image_sans_exif.filename = f"{upload_destination}.{img_format.lower()}"
-            image_sans_exif.format = img_format
+            image_sans_exif.format = storage_format(settings.IMAGE_STORAGE_PRESET, img_format)
+            image_sans_exif.filename = f"{upload_destination}.{image_sans_exif.format.lower()}"
         except UnidentifiedImageError as e:
             logger.error(constants.IMAGE_SERVICE_EXC_MSG_UNSUPPORTED_IMAGE_FORMAT + ": " + str(e))
             raise HTTPException(
@@ -137,7 +145,7 @@ def upload_images(user: User, symptom_images: list[UploadFile]):
 
     for image_sans_exif in saved_images:
         try:
-            image_sans_exif.save(fp=image_sans_exif.filename, optimize=True)
+            save_image(image_sans_exif, image_sans_exif.filename, settings.IMAGE_STORAGE_PRESET, image_sans_exif.format)
         except OSError as e:
             logger.error(constants.IMAGE_SERVICE_EXC_MSG_SAVING_IO_ERROR + ": " + str(e))
             raise HTTPException(status_code=500, detail=constants.IMAGE_SERVICE_EXC_MSG_SAVING_IO_ERROR)
@@ -168,13 +176,40 @@ def encode_images_to_base64(image_paths: list[str]):
     return [image_to_base64(path) for path in image_paths]
 
 
-def base64_images_to_urls(base64_images: list[str]):
+def base64_images_to_urls(base64_images: list[str], image_paths: list[str] | None = None):
     """
     Convert a list of base64-encoded images to data URLs.
 
     Intended for development purposes only.
     For production serve static files directly instead of embedding them.
     :param base64_images: list of base64-encoded image strings.
+    :param image_paths: paths of the images, used for detecting their media type (default: `image/jpeg`)
     :return: list of data URLs in the format: data:image/jpeg;base64,<image data>.
     """
-    return [f"data:image/jpeg;base64,{image}" for image in base64_images]
\ No newline at end of file
+    media_types = [
+        mimetypes.guess_type(path)[0] or "image/jpeg" for path in image_paths
+    ] if image_paths else ["image/jpeg"] * len(base64_images)
+    return [f"data:{media_type};base64,{image}" for media_type, image in zip(media_types, base64_images)]
+
+
+def estimate_image_tokens(width: int, height: int, detail: str) -> int:
+    """
+    Estimate input tokens of an image sent to the model, the API reports them only as part of `input_tokens`.
+
+    With `low` detail the image costs the base tokens only. Otherwise it is scaled down to fit
+    2048 x 2048 px and then its shorter side down to 768 px, and each 512 px tile of the result
+    adds tile tokens. `auto` detail is estimated as `high`.
+
+    :param width: width of the image in pixels
+    :param height: height of the image in pixels
+    :param detail: image detail requested from the model (`low`, `high` or `auto`)
+    :return: estimated count of input tokens
+    """
+    if detail == "low":
+        return _IMAGE_BASE_TOKENS
+
+    scale = min(1.0, 2048 / max(width, height))
+    scale *= min(1.0, 768 / (min(width, height) * scale))
+    tiles = math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+
+    return _IMAGE_BASE_TOKENS + _IMAGE_TILE_TOKENS * tiles
@@ -0,0 +1,121 @@
+import time
+from datetime import datetime, date, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from src.helsa.core.config import settings
+from src.helsa.core.ids import uuid7_lower_bound
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.repositories.search_repository import (
+    is_search_partitioned, get_search_partition_months, create_search_partitions, drop_search_partitions
+)
+from src.helsa.services import constants
+from src.helsa.services.similarity_service import remove_from_similarity_index_before
+
+# key of the Postgres advisory lock, allowing only one worker at a time to create partitions
+_PARTITION_LOCK_KEY = 7_245_002
+# SQLSTATE of a statement canceled by `lock_timeout`
+_LOCK_NOT_AVAILABLE = "55P03"
+
+
+def _add_months(month: date, months: int) -> date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, month_index + 1, 1)
+
+
+def ensure_search_partitions():
+    """
+    Create monthly partitions of search tables for the current month and `SEARCH_PARTITIONS_AHEAD_MONTHS`
+    following ones, so inserts never miss a partition.
+
+    Tables created before partitioning was introduced are left as they are.
+    """
+    today = datetime.now(timezone.utc).date()
+    current_month = date(today.year, today.month, 1)
+
+    with Session(engine) as session:
+        if not is_search_partitioned(session):
+            logger.warning(constants.PARTITION_SERVICE_LOG_NOT_PARTITIONED)
+            return
+
+        # transaction level lock, so concurrently starting workers do not create the same partitions
+        session.connection().execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PARTITION_LOCK_KEY})
+        existing_months = set(get_search_partition_months(session))
+
+        created = 0
+        for months in range(settings.SEARCH_PARTITIONS_AHEAD_MONTHS + 1):
+            month = _add_months(current_month, months)
+            if month not in existing_months:
+                create_search_partitions(month, session)
+                created += 1
+        session.commit()
+
+    if created:
+        logger.info(constants.PARTITION_SERVICE_LOG_PARTITIONS_CREATED.format(count=created))
+
+
+def _drop_search_partitions_with_retries(month: date, session: Session) -> int:
+    """
+    Drop partitions of the month, retrying up to `SEARCH_PARTITION_DROP_RETRIES` times
+    after `SEARCH_PARTITION_DROP_RETRY_SECONDS` when a lock was not acquired in time.
+
+    :param month: first day of the month
+    :param session: db `Session` instance
+    :return: count of dropped searches
+    """
+    for attempt in range(settings.SEARCH_PARTITION_DROP_RETRIES + 1):
+        try:
+            return drop_search_partitions(month, session)
+        except OperationalError as e:
+            session.rollback()
+            lock_timed_out = getattr(e.orig, "pgcode", None) == _LOCK_NOT_AVAILABLE
+            if not lock_timed_out or attempt == settings.SEARCH_PARTITION_DROP_RETRIES:
+                raise
+            logger.warning(constants.PARTITION_SERVICE_LOG_DROP_LOCK_TIMEOUT.format(
+                month=month.strftime("%Y-%m"), seconds=settings.SEARCH_PARTITION_DROP_RETRY_SECONDS
+            ))
+            time.sleep(settings.SEARCH_PARTITION_DROP_RETRY_SECONDS)
+
+
+def drop_expired_search_partitions(cutoff: datetime | None, session: Session) -> int:
+    """
+    Drop monthly partitions of search tables whose whole month is older than the cutoff.
+
+    :param cutoff: searches created before this time are expired regardless of tier (optional)
+    :param session: db `Session` instance
+    :return: count of dropped searches
+    """
+    if cutoff is None:
+        return 0
+    if not is_search_partitioned(session):
+        session.rollback()
+        return 0
+
+    dropped = 0
+    for month in get_search_partition_months(session):
+        next_month = _add_months(month, 1)
+        next_month_start = datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)
+        if next_month_start > cutoff:
+            break
+        dropped += _drop_search_partitions_with_retries(month, session)
+        remove_from_similarity_index_before(uuid7_lower_bound(next_month_start))
+        logger.info(constants.PARTITION_SERVICE_LOG_PARTITION_DROPPED.format(month=month.strftime("%Y-%m")))
+    session.rollback()
+
+    return dropped
+
+
+def partition_maintenance_loop():
+    """
+    Create upcoming partitions every `SEARCH_PARTITION_MAINTENANCE_SECONDS`.
+    Intended to run in a background thread.
+    """
+    while True:
+        time.sleep(settings.SEARCH_PARTITION_MAINTENANCE_SECONDS)
+        try:
+            ensure_search_partitions()
+        except Exception as e:
+            logger.error(constants.PARTITION_SERVICE_LOG_MAINTENANCE_FAILED + ": " + str(e), exc_info=True)
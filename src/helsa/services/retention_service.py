@@ -0,0 +1,143 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.models.search import RetentionResult
+from src.helsa.repositories.idempotency_repository import delete_expired_idempotency_keys
+from src.helsa.repositories.search_repository import (
+    delete_expired_searches_batch, get_image_file_deletions, delete_image_file_deletions
+)
+from src.helsa.repositories.token_repository import delete_expired_refresh_tokens
+from src.helsa.services import constants
+from src.helsa.services.partition_service import drop_expired_search_partitions
+from src.helsa.services.similarity_service import remove_from_similarity_index
+
+# key of the Postgres advisory lock, allowing only one purge at a time across workers and hosts
+_RETENTION_LOCK_KEY = 7_245_001
+
+
+def _tier_cutoffs(now: datetime) -> tuple[datetime | None, datetime | None]:
+    """
+    Compute creation time cutoffs of expired searches for each user tier.
+
+    :param now: current time
+    :return: tuple of free tier and premium tier cutoffs, None where retention is unlimited
+    """
+    free_days, premium_days = settings.RETENTION_DAYS_FREE_TIER, settings.RETENTION_DAYS_PREMIUM_TIER
+    return (
+        now - timedelta(days=free_days) if free_days is not None else None,
+        now - timedelta(days=premium_days) if premium_days is not None else None
+    )
+
+
+def _remove_queued_files(session: Session) -> int:
+    """
+    Remove image files queued for removal by purged searches, including leftovers of interrupted runs.
+
+    :param session: db `Session` instance
+    :return: count of removed files
+    """
+    removed = 0
+    while deletions := get_image_file_deletions(settings.RETENTION_BATCH_SIZE, session):
+        done_ids = []
+        for deletion in deletions:
+            try:
+                os.remove(deletion.image_src)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # keep the entry queued, the removal is retried in the next run
+                logger.error(constants.RETENTION_SERVICE_LOG_FILE_REMOVAL_FAILED + ": " + str(e))
+                continue
+            done_ids.append(deletion.id)
+
+        if not done_ids:
+            break
+        delete_image_file_deletions(done_ids, session)
+
+    return removed
+
+
+def purge_expired_searches(session: Session) -> RetentionResult:
+    """
+    Delete searches older than the retention period of their owner's tier, together with
+    their diagnoses, images and image files.
+
+    Monthly partitions expired for both tiers are dropped as a whole first. Remaining searches
+    are deleted in batches of `RETENTION_BATCH_SIZE`, each in its own short transaction
+    followed by a pause of `RETENTION_BATCH_PAUSE_SECONDS`, so hot tables are never locked for long.
+    The purge can be interrupted at any point and resumed by running it again.
+    Expired refresh tokens and idempotency keys are deleted in batches as well.
+
+    :param session: db `Session` instance
+    :return: `RetentionResult` with counts of deleted searches and removed files
+    """
+    result = RetentionResult(files_removed=_remove_queued_files(session))
+    free_tier_cutoff, premium_tier_cutoff = _tier_cutoffs(datetime.now(timezone.utc))
+    if free_tier_cutoff and premium_tier_cutoff:
+        result.searches_deleted += drop_expired_search_partitions(min(free_tier_cutoff, premium_tier_cutoff), session)
+        result.files_removed += _remove_queued_files(session)
+
+    while True:
+        deleted_ids = delete_expired_searches_batch(
+            free_tier_cutoff, premium_tier_cutoff, settings.RETENTION_BATCH_SIZE, session
+        )
+        remove_from_similarity_index(deleted_ids)
+        result.searches_deleted += len(deleted_ids)
+        result.files_removed += _remove_queued_files(session)
+        if len(deleted_ids) < settings.RETENTION_BATCH_SIZE:
+            break
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+    while delete_expired_refresh_tokens(settings.RETENTION_BATCH_SIZE, session) == settings.RETENTION_BATCH_SIZE:
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+    while delete_expired_idempotency_keys(settings.RETENTION_BATCH_SIZE, session) == settings.RETENTION_BATCH_SIZE:
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+    return result
+
+
+def run_retention() -> RetentionResult | None:
+    """
+    Run the purge, unless another worker or host is already running it.
+
+    :return: `RetentionResult` of the run, or None if the run was skipped
+    """
+    with engine.connect() as lock_connection:
+        acquired = lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": _RETENTION_LOCK_KEY}
+        ).scalar()
+        # session level lock outlives the transaction, do not keep it idle in transaction
+        lock_connection.commit()
+        if not acquired:
+            logger.info(constants.RETENTION_SERVICE_LOG_PURGE_SKIPPED)
+            return None
+
+        try:
+            with Session(engine) as session:
+                result = purge_expired_searches(session)
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _RETENTION_LOCK_KEY})
+            lock_connection.commit()
+
+    logger.info(constants.RETENTION_SERVICE_LOG_PURGE_FINISHED.format(
+        searches=result.searches_deleted, files=result.files_removed
+    ))
+    return result
+
+
+def retention_loop():
+    """ Run the purge every `RETENTION_INTERVAL_SECONDS`. Intended to run in a background thread. """
+    while True:
+        try:
+            run_retention()
+        except Exception as e:
+            logger.error(constants.RETENTION_SERVICE_LOG_PURGE_FAILED + ": " + str(e), exc_info=True)
+        time.sleep(settings.RETENTION_INTERVAL_SECONDS)
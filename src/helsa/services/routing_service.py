@@ -0,0 +1,182 @@
+import threading
+import time
+
+from openai import OpenAI, APIConnectionError, InternalServerError, RateLimitError
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.models.consultation import Prompt, DoctorsResponse
+from src.helsa.models.routing import ModelRoute, ModelUsage
+from src.helsa.models.user import User
+from src.helsa.services import constants
+
+# errors after which the request is retried with the fallback model, covers timeouts too
+_FALLBACK_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+_LATENCY_SMOOTHING = 0.2
+_DEFAULT_ROUTE = ModelRoute(name="default", model="gpt-4.1")
+
+
+class _LatencyTracker:
+    """
+    Exponentially weighted moving average of observed upstream latency per model.
+
+    Averages not updated for `MODEL_LATENCY_MAX_AGE_SECONDS` are forgotten, otherwise a model excluded
+    by `max_observed_latency_seconds` would never get the traffic which could show it recovered.
+    """
+
+    def __init__(self):
+        # model -> (average latency, monotonic time of the last observation)
+        self._latencies: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            previous = self.get(model)
+            self._latencies[model] = (
+                seconds if previous is None
+                else previous + _LATENCY_SMOOTHING * (seconds - previous),
+                now
+            )
+
+    def get(self, model: str) -> float | None:
+        entry = self._latencies.get(model)
+        if entry is None:
+            return None
+        latency, observed_at = entry
+        if time.monotonic() - observed_at > settings.MODEL_LATENCY_MAX_AGE_SECONDS:
+            return None
+        return latency
+
+
+latency_tracker = _LatencyTracker()
+
+
+def _route_matches(route: ModelRoute, symptoms: str, has_images: bool, user: User) -> bool:
+    """
+    Check if all conditions of the route match the request features.
+
+    :param route: route from the routing table
+    :param symptoms: described symptoms
+    :param has_images: True if the request contains images
+    :param user: user making the request
+    :return: True if the route applies to the request
+    """
+    if route.has_images is not None and route.has_images != has_images:
+        return False
+    if route.has_premium_tier is not None and route.has_premium_tier != user.has_premium_tier:
+        return False
+    if route.max_symptoms_length is not None and len(symptoms) > route.max_symptoms_length:
+        return False
+    if route.max_observed_latency_seconds is not None:
+        latency = latency_tracker.get(route.model)
+        if latency is not None and latency > route.max_observed_latency_seconds:
+            return False
+
+    return True
+
+
+def select_model_route(symptoms: str, has_images: bool, user: User) -> ModelRoute:
+    """
+    Select model and its parameters for a diagnose request from `MODEL_ROUTES`.
+
+    Routes are evaluated in order and the first route whose conditions all match is used.
+
+    :param symptoms: described symptoms
+    :param has_images: True if the request contains images
+    :param user: user making the request
+    :return: selected `ModelRoute`, `gpt-4.1` without fallback if no route matches
+    """
+    for route in settings.MODEL_ROUTES:
+        if _route_matches(route, symptoms, has_images, user):
+            return route
+
+    return _DEFAULT_ROUTE
+
+
+def _parse_diagnose(
+        client: OpenAI,
+        model: str,
+        timeout_seconds: float,
+        route: ModelRoute,
+        prompt: Prompt,
+        image_urls: list[str],
+        user: User,
+        max_retries: int
+) -> tuple[DoctorsResponse | None, ModelUsage]:
+    """
+    Request diagnoses from the model and record the observed latency, of failed requests too.
+
+    :return: tuple of parsed response (None if not parsed) and usage reported for the request
+    """
+    started = time.monotonic()
+    try:
+        response = client.with_options(timeout=timeout_seconds, max_retries=max_retries).responses.parse(
+            model=model,
+            input=[
+                {"role": "system", "content": prompt.system_instruction},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": prompt.query},
+                        *[
+                            {"type": "input_image", "image_url": url, "detail": route.image_detail}
+                            for url in image_urls
+                        ]
+                    ]
+                }
+            ],
+            temperature=prompt.temperature,
+            text_format=DoctorsResponse,
+            user=str(user.id)
+        )
+    finally:
+        latency_seconds = time.monotonic() - started
+        latency_tracker.observe(model, latency_seconds)
+
+    usage = ModelUsage(model=model, latency_seconds=latency_seconds)
+    if response.usage:
+        usage.input_tokens = response.usage.input_tokens
+        usage.output_tokens = response.usage.output_tokens
+
+    return response.output[0].content[0].parsed, usage
+
+
+def parse_diagnose(
+        client: OpenAI,
+        route: ModelRoute,
+        prompt: Prompt,
+        image_urls: list[str],
+        user: User
+) -> tuple[DoctorsResponse | None, ModelUsage]:
+    """
+    Request diagnoses using the selected route, retrying once with the route's fallback model
+    if the primary model times out, is unavailable or rate limited. The primary model is given
+    `timeout_seconds` of the route and the fallback model `fallback_timeout_seconds`.
+
+    :param client: `OpenAI` client
+    :param route: route selected by `select_model_route`
+    :param prompt: prompt built from the patient's report
+    :param image_urls: data URLs of uploaded images
+    :param user: user making the request
+    :return: tuple of parsed response (None if not parsed) and usage of the model which produced it,
+        with latency of the whole request
+    """
+    # with a fallback available, do not spend the timeout budget on retrying the primary model
+    max_retries = 0 if route.fallback_model else client.max_retries
+    started = time.monotonic()
+    try:
+        return _parse_diagnose(client, route.model, route.timeout_seconds, route, prompt, image_urls, user, max_retries)
+    except _FALLBACK_ERRORS as e:
+        if not route.fallback_model:
+            raise
+        logger.warning(constants.ROUTING_SERVICE_LOG_FALLBACK.format(
+            model=route.model, route=route.name, error=type(e).__name__, fallback_model=route.fallback_model
+        ))
+
+    parsed_response, usage = _parse_diagnose(
+        client, route.fallback_model, route.fallback_timeout_seconds, route, prompt, image_urls, user,
+        client.max_retries
+    )
+    usage.latency_seconds = time.monotonic() - started
+    return parsed_response, usage
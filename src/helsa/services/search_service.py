@@ -1,9 +1,19 @@
+from datetime import datetime, timezone
+
 from PIL.ImageFile import ImageFile
 from sqlmodel import Session
 
+from src.helsa.core.ids import uuid7
+from src.helsa.core.logging import logger
+from src.helsa.core.replicas import mark_written
 from src.helsa.models.consultation import PatientReport, Diagnose, DoctorsResponse
+from src.helsa.models.routing import ModelUsage
 from src.helsa.models.search import SearchImage, SearchDiagnose, Search
 from src.helsa.models.user import User
+from src.helsa.repositories.search_repository import build_search_vector
+from src.helsa.services import constants
+from src.helsa.services.similarity_service import index_search
+from src.helsa.services.usage_service import record_usage
 
 
 def _create_search_diagnose(diagnose: Diagnose):
@@ -37,7 +47,9 @@ def create_search(
         report: PatientReport,
         user: User,
         response: DoctorsResponse,
-        images: list[ImageFile]
+        images: list[ImageFile],
+        model_route: str | None = None,
+        usage: ModelUsage | None = None
 ):
     """
     Create `Search` based on data from patient's report, images, user data and response from AI.
@@ -46,17 +58,31 @@ def create_search(
     :param user: user making the search
     :param response: AI generated parsed response in `DoctorsResponse` format
     :param images: list of image files related to the search
+    :param model_route: name of the model route selected for the request (optional)
+    :param usage: usage of the model which produced the response (optional)
     :return: `Search` instance
     """
+    # the id encodes the creation time, keep both in the same month partition
+    created_at = datetime.now(timezone.utc)
     search = Search(
+        id=uuid7(created_at),
+        created_at=created_at,
         symptoms=report.symptoms,
         diagnoses=[_create_search_diagnose(diagnose) for diagnose in response.diagnoses],
         patient_age_years=report.age_years,
+        saab=report.saab,
+        duration=report.duration,
         response_tone=report.response_tone,
         language_style=report.language_style,
         user_id=user.id,
         user=user,
-        images=[_create_search_image(image) for image in images]
+        images=[_create_search_image(image) for image in images],
+        model_route=model_route,
+        model=usage.model if usage else None,
+        input_tokens=usage.input_tokens if usage else None,
+        output_tokens=usage.output_tokens if usage else None,
+        image_tokens=usage.image_tokens if usage else None,
+        upstream_latency_ms=round(usage.latency_seconds * 1000) if usage else None
     )
 
     return search
@@ -64,11 +90,27 @@ def create_search(
 
 def save_search(search: Search, session: Session):
     """
-    Save the provided `Search` to the db.
+    Save the provided `Search` with its full-text document to the db. Reads of the user go to the primary
+    until replicas replay the search. The search and its upstream usage are buffered for analytics rollups
+    once it is committed, so concurrent saves do not wait on row locks of the rollups.
+
+    Work after the commit is best-effort: its failure is logged and does not fail the request,
+    so a committed search is never saved again by a retry.
 
     :param search: `Search` with data to save
     :param session: db `Session` instance
     """
+    search.search_vector = build_search_vector(
+        search.symptoms,
+        " ".join(f"{diagnose.name} {diagnose.description}" for diagnose in search.diagnoses)
+    )
     session.add(search)
     session.commit()
-    session.refresh(search)
+    try:
+        mark_written(search.user.username)
+        session.refresh(search)
+        record_usage(search, search.user)
+        index_search(search)
+    except Exception as e:
+        logger.error(constants.SEARCH_SERVICE_LOG_AFTER_SAVE_FAILED.format(search_id=search.id) + ": " + str(e),
+                     exc_info=True)
@@ -0,0 +1,190 @@
+import threading
+import uuid
+import zlib
+from collections import defaultdict
+from typing import Hashable, Iterable
+
+import numpy as np
+
+STRUCTURED_FEATURE_WEIGHT = 2.0
+_QUERY_CHUNK_ROWS = 65536
+
+
+def _tokens(text: str) -> list[str]:
+    """
+    Split text into word unigrams and padded character trigrams of each word.
+
+    Trigrams make the vector tolerant to typos and inflections ("itching" vs "itchy").
+
+    :param text: free text
+    :return: list of tokens
+    """
+    words = "".join(c if c.isalnum() else " " for c in text.lower()).split()
+    tokens = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f" {word} "
+        tokens.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+
+    return tokens
+
+
+class SimilarityIndex:
+    """
+    In-memory index of hashed n-gram vectors with brute-force cosine search.
+
+    Each entry is a fixed size vector built with the hashing trick from symptom text
+    and structured features, L2-normalized and stored as `float16` to halve memory
+    (1M entries with 256 dimensions take ~512 MiB). Entries can be assigned to groups
+    (e.g. owner of the search), so queries scoped to a group score only its entries.
+    Removed entries are dropped from their groups and skipped by unscoped queries, memory of their
+    vectors is freed only by building a new index.
+    Queries are thread-safe and see a consistent snapshot of the index.
+    """
+
+    def __init__(self, dimensions: int = 256, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self._vectors = np.zeros((initial_capacity, dimensions), dtype=np.float16)
+        self._search_ids: list[uuid.UUID] = []
+        self._positions: dict[uuid.UUID, int] = {}
+        self._group_positions: dict[Hashable, list[int]] = defaultdict(list)
+        # groups of each position, to prune group positions of removed entries
+        self._position_groups: dict[int, tuple[Hashable, ...]] = {}
+        # replaced instead of mutated, so queries can use it after releasing the lock
+        self._removed_positions = np.empty(0, dtype=np.intp)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def search_ids(self) -> list[uuid.UUID]:
+        """ Get ids of all indexed searches. """
+        with self._lock:
+            return list(self._positions)
+
+    def __contains__(self, search_id: uuid.UUID) -> bool:
+        return search_id in self._positions
+
+    def vectorize(self, text: str, features: Iterable[str] = ()) -> np.ndarray:
+        """
+        Build normalized vector of the text and structured features.
+
+        :param text: free text, e.g. symptoms
+        :param features: structured features as `name=value` strings, weighted higher than text tokens
+        :return: `float32` vector of length `dimensions`
+        """
+        tokens = _tokens(text)
+        features = [f"f:{feature}" for feature in features]
+        hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens + features), dtype=np.uint32)
+
+        weights = np.ones(len(hashes), dtype=np.float32)
+        weights[len(tokens):] = STRUCTURED_FEATURE_WEIGHT
+        # highest hash bit decides the sign, so colliding tokens tend to cancel out instead of adding up
+        weights[hashes >> 31 == 1] *= -1
+
+        vector = np.bincount(hashes % self.dimensions, weights=weights, minlength=self.dimensions)
+        vector = vector.astype(np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm else vector
+
+    def add(self, search_id: uuid.UUID, vector: np.ndarray, groups: Iterable[Hashable] = ()):
+        """
+        Add vector of a search to the index. Already indexed searches are ignored.
+
+        :param search_id: id of the indexed search
+        :param vector: vector built by `vectorize`
+        :param groups: keys of groups the search belongs to, used for scoping queries
+        """
+        with self._lock:
+            if search_id in self._positions:
+                return
+
+            position = len(self._search_ids)
+            if position == len(self._vectors):
+                self._grow()
+
+            self._vectors[position] = vector
+            self._positions[search_id] = position
+            self._search_ids.append(search_id)
+            groups = tuple(groups)
+            if groups:
+                self._position_groups[position] = groups
+            for group in groups:
+                self._group_positions[group].append(position)
+
+    def remove(self, search_ids: Iterable[uuid.UUID]):
+        """
+        Remove searches from the index, e.g. when they were deleted. Searches not indexed are ignored.
+
+        :param search_ids: ids of removed searches
+        """
+        with self._lock:
+            positions = [self._positions.pop(search_id) for search_id in search_ids if search_id in self._positions]
+            if not positions:
+                return
+            self._removed_positions = np.union1d(self._removed_positions, np.array(positions, dtype=np.intp))
+
+            removed_by_group = defaultdict(set)
+            for position in positions:
+                for group in self._position_groups.pop(position, ()):
+                    removed_by_group[group].add(position)
+            for group, removed in removed_by_group.items():
+                remaining = [position for position in self._group_positions[group] if position not in removed]
+                if remaining:
+                    self._group_positions[group] = remaining
+                else:
+                    del self._group_positions[group]
+
+    def _grow(self):
+        """ Double the capacity of the index. Snapshots taken by running queries keep the old array. """
+        vectors = np.zeros((len(self._vectors) * 2, self.dimensions), dtype=np.float16)
+        vectors[:len(self._vectors)] = self._vectors
+        self._vectors = vectors
+
+    def query(
+            self,
+            vector: np.ndarray,
+            limit: int,
+            group: Hashable | None = None,
+            min_similarity: float = 0.0
+    ) -> list[tuple[uuid.UUID, float]]:
+        """
+        Find the most similar indexed searches.
+
+        Unscoped queries score every entry and get slow on large indexes,
+        prefer scoping them to a group.
+
+        :param vector: query vector built by `vectorize`
+        :param limit: maximum count of results
+        :param group: restrict results to searches of this group (optional)
+        :param min_similarity: minimal cosine similarity of returned results
+        :return: list of tuples with search id and cosine similarity, most similar first
+        """
+        with self._lock:
+            size = len(self._search_ids)
+            vectors, search_ids = self._vectors, self._search_ids
+            rows = np.array(self._group_positions.get(group, ()), dtype=np.intp) if group is not None else None
+            removed_positions = self._removed_positions
+
+        if rows is not None:
+            scores = vectors[rows].astype(np.float32) @ vector
+        else:
+            scores = np.empty(size, dtype=np.float32)
+            for start in range(0, size, _QUERY_CHUNK_ROWS):
+                end = min(start + _QUERY_CHUNK_ROWS, size)
+                scores[start:end] = vectors[start:end].astype(np.float32) @ vector
+
+        # group positions are pruned on removal, only unscoped queries score removed entries
+        if rows is None and len(removed_positions):
+            scores[removed_positions[removed_positions < size]] = -np.inf
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (search_ids[rows[i] if rows is not None else i], float(scores[i]))
+            for i in top
+            if scores[i] >= min_similarity
+        ]
@@ -0,0 +1,294 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlmodel import Session, select, col
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.models.consultation import (
+    PatientReport, DoctorsResponse, Diagnose, ResponseTone, LanguageStyle, SexAssignedAtBirth
+)
+from src.helsa.models.search import Search, SimilarSearch
+from src.helsa.models.user import User
+from src.helsa.repositories.search_repository import get_searches_with_diagnoses
+from src.helsa.services import constants
+
+# searches committed by other workers may carry `created_at` slightly older than the last seen one
+_REFRESH_OVERLAP = timedelta(minutes=1)
+_LOAD_CHUNK_ROWS = 10000
+
+_index = None
+_indexed_until: datetime | None = None
+
+
+def _search_features(
+        age_years: int | None,
+        response_tone: ResponseTone,
+        language_style: LanguageStyle
+) -> list[str]:
+    """
+    Structured features of a search added to its vector next to the symptom text.
+
+    :param age_years: patient's age in years
+    :param response_tone: requested tone of the response
+    :param language_style: requested language style
+    :return: list of features as `name=value` strings
+    """
+    age_decade = age_years // 10 * 10 if age_years is not None else "n/a"
+    return [f"age={age_decade}", f"tone={response_tone.value}", f"style={language_style.value}"]
+
+
+def _search_groups(
+        user_id: uuid.UUID,
+        age_years: int | None,
+        saab: SexAssignedAtBirth | None,
+        duration: str | None,
+        response_tone: ResponseTone,
+        language_style: LanguageStyle
+) -> list[tuple]:
+    """
+    Index groups of a search: its owner and its exact profile compared for near-duplicates.
+    Lookups score only the searches of one group.
+
+    The profile group belongs to the owner too, so diagnoses are never reused across users,
+    and it holds every field of the report sent to the model besides symptoms, so a reused
+    response was made for the same age, sex, duration, tone and style.
+
+    :param user_id: id of the search owner
+    :param age_years: patient's age in years
+    :param saab: patient's sex assigned at birth
+    :param duration: duration of the symptoms
+    :param response_tone: requested tone of the response
+    :param language_style: requested language style
+    :return: list of group keys
+    """
+    return [("user", user_id), ("profile", user_id, age_years, saab, duration, response_tone, language_style)]
+
+
+def _load_searches(index, session: Session, since: datetime | None) -> datetime | None:
+    """
+    Add searches created since the given time to the index, streamed in chunks.
+
+    :param index: `SimilarityIndex` to add searches to
+    :param session: db `Session` instance
+    :param since: load only searches created at or after this time (optional)
+    :return: creation time of the newest loaded search
+    """
+    statement = select(
+        Search.id, Search.user_id, Search.symptoms, Search.patient_age_years, Search.saab, Search.duration,
+        Search.response_tone, Search.language_style, Search.created_at
+    ).order_by(col(Search.created_at)).execution_options(yield_per=_LOAD_CHUNK_ROWS)
+    if since:
+        statement = statement.where(Search.created_at >= since)
+
+    newest = None
+    for search in session.exec(statement):
+        if search.id not in index:
+            index.add(
+                search.id,
+                index.vectorize(
+                    search.symptoms,
+                    _search_features(search.patient_age_years, search.response_tone, search.language_style)
+                ),
+                _search_groups(
+                    search.user_id, search.patient_age_years, search.saab, search.duration,
+                    search.response_tone, search.language_style
+                )
+            )
+        newest = search.created_at
+
+    return newest
+
+
+def build_similarity_index():
+    """
+    Build the similarity index from all saved searches.
+
+    Lookups are skipped until the index is ready.
+    `numpy` is imported only here, so it is needed only with `SIMILARITY_INDEX_ENABLED` set.
+    """
+    global _index, _indexed_until
+    from src.helsa.services.similarity_index import SimilarityIndex
+
+    started = time.perf_counter()
+    try:
+        index = SimilarityIndex(dimensions=settings.SIMILARITY_INDEX_DIMENSIONS)
+        with Session(engine) as session:
+            indexed_until = _load_searches(index, session, since=None)
+    except Exception as e:
+        logger.error(constants.SIMILARITY_SERVICE_LOG_INDEX_BUILD_FAILED + ": " + str(e), exc_info=True)
+        return
+
+    _index, _indexed_until = index, indexed_until
+    logger.info(constants.SIMILARITY_SERVICE_LOG_INDEX_BUILT.format(
+        count=len(index), seconds=time.perf_counter() - started
+    ))
+
+
+def _refresh_similarity_index():
+    """ Add searches saved by other workers since the last refresh. """
+    global _indexed_until
+    since = _indexed_until - _REFRESH_OVERLAP if _indexed_until else None
+    with Session(engine) as session:
+        _indexed_until = _load_searches(_index, session, since) or _indexed_until
+
+
+def similarity_index_loop():
+    """
+    Build the similarity index, then refresh it every `SIMILARITY_INDEX_REFRESH_SECONDS`,
+    so lookups on the request path never load searches from the db.
+    Intended to run in a background thread.
+    """
+    build_similarity_index()
+    while True:
+        time.sleep(settings.SIMILARITY_INDEX_REFRESH_SECONDS)
+        if _index is None:
+            build_similarity_index()
+            continue
+        try:
+            _refresh_similarity_index()
+        except Exception as e:
+            logger.error(constants.SIMILARITY_SERVICE_LOG_INDEX_REFRESH_FAILED + ": " + str(e), exc_info=True)
+
+
+def remove_from_similarity_index(search_ids: list[uuid.UUID]):
+    """
+    Remove deleted searches from the similarity index of this worker, if the index is built.
+
+    :param search_ids: ids of deleted searches
+    """
+    if _index is not None:
+        _index.remove(search_ids)
+
+
+def remove_from_similarity_index_before(search_id_bound: uuid.UUID):
+    """
+    Remove searches with ids lower than the bound from the similarity index of this worker,
+    e.g. after dropping a month partition. UUIDv7 ids sort by creation time.
+
+    :param search_id_bound: lowest id kept in the index
+    """
+    if _index is not None:
+        _index.remove([search_id for search_id in _index.search_ids() if search_id < search_id_bound])
+
+
+def _get_indexed_searches(search_ids: list[uuid.UUID], session: Session) -> list[Search]:
+    """
+    Get searches found by the index with diagnoses loaded. Searches deleted meanwhile, e.g. purged
+    by retention in another worker, are removed from the index of this worker.
+
+    :param search_ids: ids of searches found by the index
+    :param session: db `Session` instance
+    :return: list of existing `Search` instances, in the order of `search_ids`
+    """
+    searches = get_searches_with_diagnoses(search_ids, session)
+    if len(searches) < len(search_ids):
+        existing_ids = {search.id for search in searches}
+        _index.remove([search_id for search_id in search_ids if search_id not in existing_ids])
+
+    return searches
+
+
+def index_search(search: Search):
+    """
+    Add a saved search to the similarity index of this worker, if the index is enabled and built.
+
+    :param search: saved `Search` instance
+    """
+    if _index is None:
+        return
+
+    _index.add(
+        search.id,
+        _index.vectorize(
+            search.symptoms, _search_features(search.patient_age_years, search.response_tone, search.language_style)
+        ),
+        _search_groups(
+            search.user_id, search.patient_age_years, search.saab, search.duration,
+            search.response_tone, search.language_style
+        )
+    )
+
+
+def find_similar_searches(user: User, report: PatientReport, limit: int, session: Session) -> list[SimilarSearch]:
+    """
+    Find previous searches of the user similar to the given report.
+
+    :param user: `User` instance - owner of searches
+    :param report: report with symptoms and structured fields to compare
+    :param limit: maximum count of returned searches
+    :param session: db `Session` instance
+    :raise HTTPException (503 Service Unavailable): if the index is disabled or not built yet
+    :return: list of `SimilarSearch`, most similar first
+    """
+    if _index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=constants.SIMILARITY_SERVICE_EXC_MSG_NOT_AVAILABLE
+        )
+
+    vector = _index.vectorize(
+        report.symptoms, _search_features(report.age_years, report.response_tone, report.language_style)
+    )
+    similarities = dict(_index.query(vector, limit, group=("user", user.id)))
+    searches = _get_indexed_searches(list(similarities), session)
+
+    return [
+        SimilarSearch(
+            id=search.id,
+            symptoms=search.symptoms,
+            diagnoses=[diagnose.name for diagnose in search.diagnoses],
+            created_at=search.created_at,
+            similarity=similarities[search.id]
+        )
+        for search in searches
+    ]
+
+
+def find_near_duplicate_response(user: User, report: PatientReport, session: Session) -> DoctorsResponse | None:
+    """
+    Find diagnoses of a previous search of the user which is a near-duplicate of the given report.
+
+    A previous search qualifies if its vector similarity reaches `SIMILARITY_NEAR_DUPLICATE_THRESHOLD`
+    and it has exactly the same age, sex, duration, response tone and language style. Searches of other
+    users are never reused. Used to skip the AI service call, only if `SIMILARITY_SHORT_CIRCUIT_ENABLED`
+    is set and the index is built.
+
+    :param user: user making the request
+    :param report: patient's report
+    :param session: db `Session` instance
+    :return: `DoctorsResponse` with diagnoses of the near-duplicate search, or None if there is none
+    """
+    if not settings.SIMILARITY_SHORT_CIRCUIT_ENABLED or _index is None:
+        return None
+
+    vector = _index.vectorize(
+        report.symptoms, _search_features(report.age_years, report.response_tone, report.language_style)
+    )
+    similarities = dict(_index.query(
+        vector,
+        limit=5,
+        group=_search_groups(
+            user.id, report.age_years, report.saab, report.duration, report.response_tone, report.language_style
+        )[1],
+        min_similarity=settings.SIMILARITY_NEAR_DUPLICATE_THRESHOLD
+    ))
+
+    for search in _get_indexed_searches(list(similarities), session):
+        if search.diagnoses:
+            logger.info(constants.SIMILARITY_SERVICE_LOG_NEAR_DUPLICATE.format(
+                search_id=search.id, similarity=similarities[search.id]
+            ))
+            return DoctorsResponse(diagnoses=[
+                Diagnose(
+                    name=diagnose.name,
+                    description=diagnose.description,
+                    recommended_action=diagnose.recommended_action
+                )
+                for diagnose in search.diagnoses
+            ])
+
+    return None
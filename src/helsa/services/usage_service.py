@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import Counter
+
+from sqlmodel import Session, SQLModel
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.database import engine
+from src.helsa.models.analytics import UserUsageDailyRollup
+from src.helsa.models.search import Search
+from src.helsa.models.user import User
+from src.helsa.repositories.analytics_repository import (
+    ROLLUP_COLUMNS, get_search_rollup_increments, increment_rollups
+)
+from src.helsa.services import constants
+
+
+class _UsageBuffer:
+    """
+    Counts of saved searches and their upstream usage summed in memory per rollup row until they are flushed.
+
+    Each worker keeps its own buffer, rollups are incremented, so flushes of all workers add up.
+    """
+
+    def __init__(self):
+        self._usage: dict[tuple[type[SQLModel], tuple], Counter] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: type[SQLModel], key: tuple, counters: Counter):
+        with self._lock:
+            self._usage.setdefault((model, key), Counter()).update(counters)
+
+    def take(self) -> dict[tuple[type[SQLModel], tuple], Counter]:
+        """ Take all buffered counts, leaving the buffer empty. """
+        with self._lock:
+            usage, self._usage = self._usage, {}
+        return usage
+
+    def restore(self, usage: dict[tuple[type[SQLModel], tuple], Counter]):
+        """ Put back counts which were taken but could not be flushed. """
+        for (model, key), counters in usage.items():
+            self.add(model, key, counters)
+
+
+usage_buffer = _UsageBuffer()
+# serializes flushes of the loop and the shutdown, so the shutdown flush does not miss usage being flushed
+_flush_lock = threading.Lock()
+
+
+def record_usage(search: Search, user: User):
+    """
+    Buffer a saved search for the daily search, style and diagnose rollups, and its upstream usage
+    for the daily usage rollups.
+
+    Usage of searches answered without calling the model, e.g. from a near-duplicate, is not recorded.
+
+    :param search: saved `Search` with its usage
+    :param user: owner of the search
+    """
+    for model, key, counters in get_search_rollup_increments(search, user):
+        usage_buffer.add(model, key, counters)
+    if search.model is None:
+        return
+
+    image_count = len(search.images or [])
+    key = (search.created_at.date(), user.id, user.has_premium_tier, search.model)
+    usage_buffer.add(UserUsageDailyRollup, key, Counter(
+        search_count=1,
+        searches_with_images_count=1 if image_count else 0,
+        image_count=image_count,
+        input_tokens=search.input_tokens or 0,
+        output_tokens=search.output_tokens or 0,
+        image_tokens=search.image_tokens or 0,
+        upstream_latency_ms=search.upstream_latency_ms or 0
+    ))
+
+
+def flush_usage() -> int:
+    """
+    Write buffered counts to daily rollups in batches of `USAGE_FLUSH_BATCH_SIZE` rows, all in one transaction.
+    If writing fails, the counts are put back to the buffer for the next flush.
+
+    Saves of searches do not touch the rollups, so they do not serialize on row locks of the rollups
+    of the same day, only concurrent flushes of the workers do.
+
+    :return: count of flushed rollup rows
+    """
+    with _flush_lock:
+        usage = usage_buffer.take()
+        if not usage:
+            return 0
+
+        rows: dict[type[SQLModel], list[dict]] = {model: [] for model in ROLLUP_COLUMNS}
+        for (model, key), counters in usage.items():
+            key_columns, counter_columns = ROLLUP_COLUMNS[model]
+            rows[model].append({**dict(zip(key_columns, key)), **{name: counters[name] for name in counter_columns}})
+        try:
+            with Session(engine) as session:
+                # rollups in a fixed order, so concurrent flushes of the workers take row locks in the same order
+                for model, model_rows in rows.items():
+                    for start in range(0, len(model_rows), settings.USAGE_FLUSH_BATCH_SIZE):
+                        increment_rollups(model, model_rows[start:start + settings.USAGE_FLUSH_BATCH_SIZE], session)
+                session.commit()
+        except Exception:
+            usage_buffer.restore(usage)
+            raise
+
+    return len(usage)
+
+
+def usage_flush_loop():
+    """ Flush buffered counts every `USAGE_FLUSH_SECONDS`. Intended to run in a background thread. """
+    while True:
+        time.sleep(settings.USAGE_FLUSH_SECONDS)
+        try:
+            flush_usage()
+        except Exception as e:
+            logger.error(constants.USAGE_SERVICE_LOG_FLUSH_FAILED + ": " + str(e), exc_info=True)
@@ -0,0 +1,313 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from src.helsa.core.config import settings
+from src.helsa.core.logging import logger
+from src.helsa.core.security import hash_password
+from src.helsa.models.user import (
+    UserFlagsRequest, UserFlagsFailure, UserFlagsBulkResult, UserCreate, UserCreateFailure, UserCreateBulkResult
+)
+from src.helsa.repositories.user_repository import save_user_flags_bulk, insert_users
+from src.helsa.services import constants
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+CONTENT_TYPE_CSV = "text/csv"
+BULK_CONTENT_TYPES = (CONTENT_TYPE_JSON, CONTENT_TYPE_NDJSON, CONTENT_TYPE_CSV)
+
+ParsedEntry = tuple[int, UserFlagsRequest | UserFlagsFailure]
+ParsedCreateEntry = tuple[int, UserCreate | UserCreateFailure]
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """
+    Format pydantic validation error into a short single line message.
+
+    :param error: raised `ValidationError`
+    :return: message listing invalid fields and reasons
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+def _validate_entry(line: int, data: dict) -> ParsedEntry:
+    """
+    Validate a single decoded entry of bulk request.
+
+    :param line: position of the entry in the request body (1-based)
+    :param data: decoded entry data
+    :return: tuple of line and either valid `UserFlagsRequest` or `UserFlagsFailure`
+    """
+    try:
+        user_flags_request = UserFlagsRequest.model_validate(data)
+    except ValidationError as e:
+        username = data.get("username") if isinstance(data, dict) else None
+        return line, UserFlagsFailure(line=line, username=username, error=_format_validation_error(e))
+
+    if not user_flags_request.user_flags.model_dump(exclude_none=True):
+        return line, UserFlagsFailure(
+            line=line,
+            username=str(user_flags_request.username),
+            error=constants.USER_SERVICE_EXC_MSG_NO_FLAGS
+        )
+
+    return line, user_flags_request
+
+
+def _csv_values_to_entry(values: dict) -> dict:
+    """
+    Convert CSV row to the `UserFlagsRequest` shape. Empty cells leave the flag unset.
+
+    :param values: CSV row values by header columns
+    :return: dict with `username` and `user_flags` keys
+    """
+    values = dict(values)
+    username = values.pop("username", None)
+    return {"username": username, "user_flags": {key: value for key, value in values.items() if value != ""}}
+
+
+async def _iter_body_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Iterate over lines of the request body as it is streamed, without buffering the whole body.
+    Lines are not decoded, so a line with invalid text fails on its own.
+
+    :param request: incoming request
+    :return: async iterator of raw lines
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+
+async def _iter_bulk_records(request: Request, content_type: str) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse bulk request body into raw records, one per user.
+
+    Supported formats:
+
+        * `application/json` - JSON list of objects
+        * `application/x-ndjson` - one object per line, streamed
+        * `text/csv` - header with `username` and other columns, one user per row, streamed
+
+    CSV rows are yielded as dicts of values by header columns. Lines of NDJSON and CSV which
+    are not valid UTF-8 or JSON are yielded as error messages, a CSV header which can not be
+    read ends the body.
+
+    :param request: incoming request
+    :param content_type: media type of the request body, one of `BULK_CONTENT_TYPES`
+    :raise HttpException (400 Bad Request): if JSON body is not a valid JSON document
+    :return: async iterator of tuples with line and either decoded record or error message
+    """
+    if content_type == CONTENT_TYPE_JSON:
+        try:
+            entries = await request.json()
+        except ValueError:
+            # covers both invalid JSON and invalid UTF-8
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=constants.USER_SERVICE_EXC_MSG_INVALID_JSON_BODY
+            )
+        if not isinstance(entries, list):
+            entries = [entries]
+        for line, data in enumerate(entries, start=1):
+            yield line, data
+        return
+
+    header = None
+    line = 0
+    async for raw_line in _iter_body_lines(request):
+        line += 1
+        try:
+            text = raw_line.decode("utf-8")
+        except UnicodeDecodeError:
+            yield line, constants.USER_SERVICE_EXC_MSG_INVALID_UTF8
+            if content_type == CONTENT_TYPE_CSV and header is None:
+                return
+            continue
+        if not text.strip():
+            continue
+
+        if content_type == CONTENT_TYPE_NDJSON:
+            try:
+                yield line, json.loads(text)
+            except json.JSONDecodeError:
+                yield line, constants.USER_SERVICE_EXC_MSG_INVALID_JSON
+        elif header is None:
+            header = [column.strip() for column in next(csv.reader([text]))]
+            if "username" not in header:
+                yield line, constants.USER_SERVICE_EXC_MSG_CSV_MISSING_USERNAME
+                return
+        else:
+            yield line, dict(zip(header, next(csv.reader([text]))))
+
+
+async def iter_user_flags_entries(request: Request, content_type: str) -> AsyncIterator[ParsedEntry]:
+    """
+    Parse bulk user flags request body into validated entries.
+
+    CSV body has `username` and flag columns. Entries which can not be parsed are
+    yielded as `UserFlagsFailure`, so the rest of the request is still applied.
+
+    :param request: incoming request
+    :param content_type: media type of the request body, one of `BULK_CONTENT_TYPES`
+    :return: async iterator of tuples with line and parsed entry
+    """
+    async for line, data in _iter_bulk_records(request, content_type):
+        if isinstance(data, str):
+            yield line, UserFlagsFailure(line=line, error=data)
+        elif content_type == CONTENT_TYPE_CSV:
+            yield _validate_entry(line, _csv_values_to_entry(data))
+        else:
+            yield _validate_entry(line, data)
+
+
+async def iter_user_create_entries(request: Request, content_type: str) -> AsyncIterator[ParsedCreateEntry]:
+    """
+    Parse bulk user provisioning request body into validated entries.
+
+    Every entry has `username` and `password` (CSV columns or object keys). Entries
+    which can not be parsed are yielded as `UserCreateFailure`.
+
+    :param request: incoming request
+    :param content_type: media type of the request body, one of `BULK_CONTENT_TYPES`
+    :return: async iterator of tuples with line and parsed entry
+    """
+    async for line, data in _iter_bulk_records(request, content_type):
+        if isinstance(data, str):
+            yield line, UserCreateFailure(line=line, error=data)
+            continue
+
+        try:
+            yield line, UserCreate.model_validate(data)
+        except ValidationError as e:
+            username = data.get("username") if isinstance(data, dict) else None
+            yield line, UserCreateFailure(line=line, username=username, error=_format_validation_error(e))
+
+
+def apply_user_flags_batch(
+        batch: list[tuple[int, UserFlagsRequest]],
+        session: Session,
+        result: UserFlagsBulkResult
+):
+    """
+    Save one batch of user flags in a single transaction and record the outcome per user.
+
+    :param batch: list of tuples with line and valid `UserFlagsRequest`
+    :param session: db `Session` instance
+    :param result: bulk result updated in place with counts and failures
+    """
+    try:
+        updated_usernames = save_user_flags_bulk([entry for _, entry in batch], session)
+    except SQLAlchemyError as e:
+        session.rollback()
+        logger.error(constants.USER_SERVICE_EXC_MSG_BATCH_FAILED + ": " + str(e))
+        result.failed.extend(
+            UserFlagsFailure(line=line, username=str(entry.username), error=constants.USER_SERVICE_EXC_MSG_BATCH_FAILED)
+            for line, entry in batch
+        )
+        return
+
+    for line, entry in batch:
+        if str(entry.username) in updated_usernames:
+            result.updated += 1
+        else:
+            result.failed.append(
+                UserFlagsFailure(line=line, username=str(entry.username), error=constants.USER_SERVICE_EXC_MSG_USER_NOT_FOUND)
+            )
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash many passwords in parallel worker threads. bcrypt releases the GIL while hashing,
+    so the work spreads over `PASSWORD_HASH_WORKERS` CPU cores.
+
+    :param passwords: passwords in plain text format
+    :return: password hashes in the same order
+    """
+    with ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS) as executor:
+        return list(executor.map(hash_password, passwords))
+
+
+def create_user(user_create: UserCreate, session: Session) -> bool:
+    """
+    Create a new user with a single conflict-handling insert.
+
+    :param user_create: `UserCreate` instance with valid username and password values
+    :param session: db `Session` instance
+    :return: True if the user was created, False if the username already exists
+    """
+    created = insert_users(
+        [{"username": str(user_create.username), "password_hash": hash_password(user_create.password)}],
+        session
+    )
+    session.commit()
+
+    return bool(created)
+
+
+def create_users_batch(
+        batch: list[tuple[int, UserCreate]],
+        session: Session,
+        result: UserCreateBulkResult,
+        seen_usernames: set[str]
+):
+    """
+    Hash passwords of one batch in parallel and insert the users in a single transaction,
+    recording the outcome per user.
+
+    Usernames repeated within the request are reported as conflicts without being hashed,
+    only their first occurrence is inserted.
+
+    :param batch: list of tuples with line and valid `UserCreate`
+    :param session: db `Session` instance
+    :param result: bulk result updated in place with counts and failures
+    :param seen_usernames: usernames of the request processed so far, updated in place
+    """
+    unique_batch = []
+    for line, entry in batch:
+        username = str(entry.username)
+        if username in seen_usernames:
+            result.failed.append(
+                UserCreateFailure(line=line, username=username, error=constants.USER_SERVICE_EXC_MSG_USERNAME_EXISTS)
+            )
+            continue
+        seen_usernames.add(username)
+        unique_batch.append((line, entry))
+
+    password_hashes = hash_passwords([entry.password for _, entry in unique_batch])
+    users = [
+        {"username": str(entry.username), "password_hash": password_hash}
+        for (_, entry), password_hash in zip(unique_batch, password_hashes)
+    ]
+    try:
+        created_usernames = insert_users(users, session)
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        logger.error(constants.USER_SERVICE_EXC_MSG_CREATE_BATCH_FAILED + ": " + str(e))
+        result.failed.extend(
+            UserCreateFailure(line=line, username=str(entry.username), error=constants.USER_SERVICE_EXC_MSG_CREATE_BATCH_FAILED)
+            for line, entry in unique_batch
+        )
+        return
+
+    for line, entry in unique_batch:
+        if str(entry.username) in created_usernames:
+            result.created += 1
+        else:
+            result.failed.append(
+                UserCreateFailure(line=line, username=str(entry.username), error=constants.USER_SERVICE_EXC_MSG_USERNAME_EXISTS)
+            )